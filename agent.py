@@ -1,9 +1,27 @@
+import copy
 import hashlib
+import heapq
 import math
 import random
 import sys
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Agent:
+    __slots__ = ("ID", "age", "aggressionFactor", "aggressionFactorModifier", "alive", "baseInterestRate", "born", "causeOfDeath", "cell", "cellsInRange",
+                 "childEndowmentHashes", "conflictHappiness", "debug", "decisionModel", "decisionModelFactor", "decisionModelLookaheadDiscount",
+                 "decisionModelLookaheadFactor", "decisionModelTribalFactor", "depressed", "depressionFactor", "diseases", "familyHappiness", "fertile",
+                 "fertilityAge", "fertilityFactor", "fertilityFactorModifier", "follower", "happiness", "healthHappiness", "immuneSystem", "immuneSystemBits", "infertilityAge",
+                 "inheritancePolicy", "lastDoneCombat", "lastMoved", "lastReproduced", "lastSpice", "lastSugar", "lastUniversalSpiceIncomeTimestep",
+                 "lastUniversalSugarIncomeTimestep", "leader", "lendingFactor", "loanDuration", "lookaheadFactor", "marginalRateOfSubstitution", "maxAge",
+                 "maxFriends", "movement", "movementMode", "movementModifier", "neighborhood", "neighborhoodMode", "neighbors", "nice", "seed",
+                 "selfishnessFactor", "sex", "socialGraph", "socialHappiness", "socialNetwork", "spice", "spiceMeanIncome", "spiceMetabolism", "spiceMetabolismModifier",
+                 "spicePrice", "startingImmuneSystem", "startingSpice", "startingSugar", "sugar", "sugarMeanIncome", "sugarMetabolism",
+                 "sugarMetabolismModifier", "sugarPrice", "tagBits", "tagPreferences", "tagZeroes", "tagging", "tags", "timeToLive", "timeToLiveInputs", "timestep",
+                 "tradeFactor", "tradeVolume", "tribe", "universalSpice", "universalSugar", "vision", "visionMode", "visionModifier", "wealthHappiness")
+
     def __init__(self, agentID, birthday, cell, configuration):
         self.ID = agentID
         self.born = birthday
@@ -23,6 +41,8 @@ class Agent:
         self.follower = configuration["follower"]
         self.leader = not self.follower
         self.immuneSystem = configuration["immuneSystem"]
+        # Immune system is also packed into an integer with position i at bit i for Hamming distances by popcount
+        self.immuneSystemBits = sum(bit << i for i, bit in enumerate(self.immuneSystem)) if self.immuneSystem != None else None
         self.infertilityAge = configuration["infertilityAge"]
         self.inheritancePolicy = configuration["inheritancePolicy"]
         self.lendingFactor = configuration["lendingFactor"]
@@ -45,7 +65,6 @@ class Agent:
         self.sugarMetabolism = configuration["sugarMetabolism"]
         self.tagging = configuration["tagging"]
         self.tagPreferences = configuration["tagPreferences"]
-        self.tags = configuration["tags"]
         self.tradeFactor = configuration["tradeFactor"]
         self.universalSpice = configuration["universalSpice"]
         self.universalSugar = configuration["universalSugar"]
@@ -79,6 +98,9 @@ class Agent:
         self.neighbors = []
         self.nice = 0
         self.socialHappiness = 0
+        # Family, friends and loans refer to other agents by ID, resolved through the simulation's social graph
+        self.socialGraph = cell.environment.sugarscape.socialGraph
+        self.socialGraph.addAgent(self)
         self.socialNetwork = {"father": None, "mother": None, "children": [], "friends": [], "creditors": [], "debtors": [], "mates": []}
         self.spiceMeanIncome = 1
         self.spiceMetabolismModifier = 0
@@ -86,10 +108,12 @@ class Agent:
         self.sugarMeanIncome = 1
         self.sugarMetabolismModifier = 0
         self.sugarPrice = 0
-        self.tagZeroes = 0
+        # Time to live is kept along with the resources and metabolisms it was found from
+        self.timeToLive = 0
+        self.timeToLiveInputs = None
         self.timestep = birthday
         self.tradeVolume = 0
-        self.tribe = self.findTribe()
+        self.setTags(configuration["tags"])
         self.visionModifier = 0
         self.wealthHappiness = 0
 
@@ -129,26 +153,18 @@ class Agent:
         return child
 
     def addAgentToSocialNetwork(self, agent):
-        agentID = agent.ID
-        if agentID in self.socialNetwork:
-            return
-        self.socialNetwork[agentID] = {"agent": agent, "lastSeen": self.lastMoved, "timesVisited": 1, "timesReproduced": 0,
-                                         "timesTraded": 0, "timesLoaned": 0, "marginalRateOfSubstitution": 0}
+        return self.socialGraph.addEdge(self.ID, agent.ID, self.lastMoved)
 
     def addLoanFromAgent(self, agent, timestep, sugarLoan, spiceLoan, duration):
         agentID = agent.ID
-        if agentID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(agent)
-        self.socialNetwork[agentID]["timesLoaned"] += 1
+        self.addAgentToSocialNetwork(agent).timesLoaned += 1
         loan = {"creditor": agentID, "debtor": self.ID, "sugarLoan": sugarLoan, "spiceLoan": spiceLoan, "loanDuration": duration,
                 "loanOrigin": timestep}
         self.socialNetwork["creditors"].append(loan)
 
     def addLoanToAgent(self, agent, timestep, sugarPrincipal, sugarLoan, spicePrincipal, spiceLoan, duration):
         agentID = agent.ID
-        if agentID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(agent)
-        self.socialNetwork[agentID]["timesLoaned"] += 1
+        self.addAgentToSocialNetwork(agent).timesLoaned += 1
         agent.addLoanFromAgent(self, timestep, sugarLoan, spiceLoan, duration)
         loan = {"creditor": self.ID, "debtor": agentID, "sugarLoan": sugarLoan, "spiceLoan": spiceLoan, "loanDuration": duration,
                 "loanOrigin": timestep}
@@ -186,7 +202,7 @@ class Agent:
             return
         startIndex = diseaseInImmuneSystem["start"]
         endIndex = diseaseInImmuneSystem["end"]
-        caughtDisease = {"disease": disease, "startIndex": startIndex, "endIndex": endIndex}
+        caughtDisease = {"disease": disease, "startIndex": startIndex, "endIndex": endIndex, "mismatches": self.findImmuneResponseMismatches(disease, startIndex)}
         if infector != None:
             caughtDisease["infector"] = infector
         self.diseases.append(caughtDisease)
@@ -240,31 +256,37 @@ class Agent:
         self.resetCell()
         self.doInheritance()
 
+        # Creditors who died earlier may have been waiting on this agent's debts to be released
+        for loan in self.socialNetwork["creditors"]:
+            self.socialGraph.removeAgent(self.socialGraph.findAgent(loan["creditor"]))
         # Keep only debtors and children in social network to handle outstanding loans
         self.socialNetwork = {"debtors": self.socialNetwork["debtors"], "children": self.socialNetwork["children"]}
+        self.socialGraph.removeAgent(self)
         self.neighbors = []
         self.neighborhood = []
         self.diseases = []
 
     def doDisease(self):
         random.shuffle(self.diseases)
-        for diseaseRecord in self.diseases:
-            diseaseTags = diseaseRecord["disease"].tags
-            immuneResponseStart = diseaseRecord["startIndex"]
-            immuneResponseEnd = min(diseaseRecord["endIndex"] + 1, len(self.immuneSystem))
-            immuneResponse = self.immuneSystem[immuneResponseStart:immuneResponseEnd]
-            for i in range(len(immuneResponse)):
-                if immuneResponse[i] != diseaseTags[i]:
-                    self.immuneSystem[immuneResponseStart + i] = diseaseTags[i]
-                    break
-            if diseaseTags == immuneResponse:
-                self.diseases.remove(diseaseRecord)
+        i = 0
+        while i < len(self.diseases):
+            diseaseRecord = self.diseases[i]
+            mismatches = diseaseRecord["mismatches"]
+            if mismatches == 0:
+                # The record after a recovered disease shifts into its place and waits until the next timestep
+                del self.diseases[i]
                 self.updateDiseaseEffects(diseaseRecord["disease"])
+            else:
+                firstMismatch = (mismatches & -mismatches).bit_length() - 1
+                immuneResponsePosition = diseaseRecord["startIndex"] + firstMismatch
+                if immuneResponsePosition < len(self.immuneSystem):
+                    self.updateImmuneSystem(immuneResponsePosition, diseaseRecord["disease"].tags[firstMismatch])
+            i += 1
 
         diseaseCount = len(self.diseases)
         if diseaseCount == 0:
             return
-        neighborCells = self.cell.neighbors.values()
+        neighborCells = self.cell.findNeighborCells()
         neighbors = []
         for neighborCell in neighborCells:
             neighbor = neighborCell.agent
@@ -287,7 +309,8 @@ class Agent:
         livingSons = []
         livingDaughters = []
         livingFriends = []
-        for child in self.socialNetwork["children"]:
+        for childID in self.socialNetwork["children"]:
+            child = self.socialGraph.findAgent(childID)
             if child.isAlive() == True:
                 livingChildren.append(child)
                 childSex = child.sex
@@ -295,9 +318,10 @@ class Agent:
                     livingSons.append(child)
                 elif childSex == "female":
                     livingDaughters.append(child)
-        for friend in self.socialNetwork["friends"]:
-            if friend["friend"].isAlive() == True:
-                livingFriends.append(friend["friend"])
+        for friendRecord in self.socialNetwork["friends"]:
+            friend = self.socialGraph.findAgent(friendRecord["friend"])
+            if friend.isAlive() == True:
+                livingFriends.append(friend)
 
         if self.inheritancePolicy == "children" and len(livingChildren) > 0:
             sugarInheritance = self.sugar / len(livingChildren)
@@ -395,7 +419,7 @@ class Agent:
         # Agent marked for removal or not interested in reproduction should not reproduce
         if self.isAlive() == False or self.isFertile() == False:
             return
-        neighborCells = list(self.cell.neighbors.values())
+        neighborCells = self.cell.findNeighborCells()
         random.shuffle(neighborCells)
         emptyCells = self.findEmptyNeighborCells()
         for neighborCell in neighborCells:
@@ -411,13 +435,13 @@ class Agent:
                     # If no adjacent empty cell is found, skip reproduction with this neighbor
                     if emptyCell.agent != None:
                         continue
-                    if neighbor not in self.socialNetwork["mates"]:
-                        self.socialNetwork["mates"].append(neighbor)
+                    if neighbor.ID not in self.socialNetwork["mates"]:
+                        self.socialNetwork["mates"].append(neighbor.ID)
                     childEndowment = self.findChildEndowment(neighbor)
                     child = self.addChildToCell(neighbor, emptyCell, childEndowment)
                     child.findCellsInRange()
                     child.findNeighborhood()
-                    self.socialNetwork["children"].append(child)
+                    self.socialNetwork["children"].append(child.ID)
                     childID = child.ID
                     neighborID = neighbor.ID
                     self.addAgentToSocialNetwork(child)
@@ -442,14 +466,13 @@ class Agent:
     def doTagging(self):
         if self.tags == None or self.isAlive() == False or self.tagging == False:
             return
-        neighborCells = list(self.cell.neighbors.values())
+        neighborCells = self.cell.findNeighborCells()
         random.shuffle(neighborCells)
         for neighborCell in neighborCells:
             neighbor = neighborCell.agent
             if neighbor != None:
                 position = random.randrange(len(self.tags))
                 neighbor.flipTag(position, self.tags[position])
-                neighbor.tribe = neighbor.findTribe()
 
     def doTimestep(self, timestep):
         self.timestep = timestep
@@ -486,7 +509,7 @@ class Agent:
         self.sugarPrice = 0
         self.spicePrice = 0
         self.findMarginalRateOfSubstitution()
-        neighborCells = self.cell.neighbors.values()
+        neighborCells = self.cell.findNeighborCells()
         traders = []
         for neighborCell in neighborCells:
             neighbor = neighborCell.agent
@@ -592,11 +615,14 @@ class Agent:
         if self.follower == True and leader != None:
             return leader.findBestCellForAgent(self)
 
-        potentialCells = self.rankCellsInRange()
-        bestCell = potentialCells[0]["cell"]
+        # Selfish agents only need the best cell, so search outward and stop once no remaining cell can do better
+        if self.decisionModelFactor <= 0 or (self.decisionModel == "none" and "all" not in self.debug and "agent" not in self.debug):
+            return self.findBestCellInRange()
 
-        if self.decisionModelFactor > 0:
-            bestCell = self.findBestEthicalCell(potentialCells, bestCell)
+        # Only the best cell is needed, so avoid ranking every cell in range
+        potentialCells = self.findPotentialCells()
+        bestCell = self.findTopCellsByWealth(potentialCells, 1)[0][0]
+        bestCell = self.findBestEthicalCell(potentialCells, bestCell)
         if bestCell == None:
             bestCell = self.cell
         return bestCell
@@ -605,41 +631,102 @@ class Agent:
         if len(cells) == 0:
             return None
         bestCell = None
-        cells = self.sortCellsByWealth(cells)
         if "all" in self.debug or "agent" in self.debug:
+            cells = self.sortCellsByWealth(cells)
             self.printCellScores(cells)
         # If not an ethical agent, return top selfish choice
         if self.decisionModel == "none":
             return greedyBestCell
-
-        for cell in cells:
-            cell["wealth"] = self.findEthicalValueOfCell(cell["cell"])
-        if self.selfishnessFactor >= 0:
-            for cell in cells:
-                if cell["wealth"] > 0:
-                    bestCell = cell["cell"]
-                    break
+        if greedyBestCell == None:
+            greedyBestCell = self.findTopCellsByWealth(cells, 1)[0][0]
+
+        if self.selfishnessFactor >= 0 and "Top" not in self.decisionModel:
+            # Only the first cell in wealth order with positive ethical value is needed, so rank lazily
+            rankedCells = [(-wealth, cellRange, i, cell) for i, (cell, wealth, cellRange) in enumerate(cells)]
+            heapq.heapify(rankedCells)
+            # Value cells in batches that double in size so the first positive cell is usually found without valuing every cell
+            batchSize = 1
+            ethicalNeighbors = self.findEthicalNeighbors()
+            while len(rankedCells) > 0 and bestCell == None:
+                batch = [heapq.heappop(rankedCells)[3] for i in range(min(batchSize, len(rankedCells)))]
+                for cell, ethicalValue in zip(batch, self.findEthicalValuesOfCells(batch, ethicalNeighbors)):
+                    if ethicalValue > 0:
+                        bestCell = cell
+                        break
+                batchSize *= 2
         else:
-            # Negative utilitarian model uses positive and negative utility to find minimum harm
-            cells.sort(key = lambda cell: (cell["wealth"]["unhappiness"], cell["wealth"]["happiness"]), reverse = True)
-            bestCell = cells[0]["cell"]
-
-        # If additional ordering consideration, select new best cell
-        if "Top" in self.decisionModel:
             cells = self.sortCellsByWealth(cells)
-            if "all" in self.debug or "agent" in self.debug:
-                self.printEthicalCellScores(cells)
-            bestCell = cells[0]["cell"]
+            ethicalValues = self.findEthicalValuesOfCells([cell for cell, wealth, cellRange in cells])
+            cells = [(cell, ethicalValue, cellRange) for (cell, wealth, cellRange), ethicalValue in zip(cells, ethicalValues)]
+            if self.selfishnessFactor >= 0:
+                for cell, wealth, cellRange in cells:
+                    if wealth > 0:
+                        bestCell = cell
+                        break
+            else:
+                # Negative utilitarian model uses positive and negative utility to find minimum harm
+                cells.sort(key = lambda cell: (cell[1]["unhappiness"], cell[1]["happiness"]), reverse = True)
+                bestCell = cells[0][0]
+
+            # If additional ordering consideration, select new best cell
+            if "Top" in self.decisionModel:
+                cells = self.sortCellsByWealth(cells)
+                if "all" in self.debug or "agent" in self.debug:
+                    self.printEthicalCellScores(cells)
+                bestCell = cells[0][0]
 
         if bestCell == None:
-            if greedyBestCell == None:
-                bestCell = cells[0]["cell"]
-            else:
-                bestCell = greedyBestCell
+            bestCell = greedyBestCell
             if "all" in self.debug or "agent" in self.debug:
                 print(f"Agent {self.ID} could not find an ethical cell")
         return bestCell
 
+    def findBestCellInRange(self):
+        aggression = self.findAggression()
+        self.findNeighborhood()
+        if len(self.cellsInRange) == 0:
+            return self.cell
+        # Shuffle search positions instead of cells so ties are broken as in a search over shuffled cells
+        shuffledPositions = list(range(len(self.cellsInRange)))
+        random.shuffle(shuffledPositions)
+        cellPositions = [0] * len(shuffledPositions)
+        for position, i in enumerate(shuffledPositions):
+            cellPositions[i] = position
+
+        retaliators = self.findRetaliatorsInVision()
+        combatMaxLoot = self.cell.environment.maxCombatLoot
+        welfareCache = self.cell.environment.welfareCache.setdefault(self.findWelfareClass(), {})
+
+        bestCell = None
+        bestWealth = None
+        bestRange = 0
+        bestPosition = 0
+        capacityClasses = None
+        welfareBounds = None
+        # Cells in range are ordered by range ring, so nearby cells become the incumbent first
+        for i, (cell, travelDistance) in enumerate(self.cellsInRange.items()):
+            # Skip cells whose capacities cannot beat the incumbent or could only tie it from further away
+            if welfareBounds != None:
+                welfareBound = welfareBounds[capacityClasses[cell.index]]
+                if welfareBound < bestWealth or (welfareBound == bestWealth and (travelDistance > bestRange or (travelDistance == bestRange and cellPositions[i] > bestPosition))):
+                    continue
+            welfare = self.findCellWelfare(cell, aggression, retaliators, welfareCache)
+            if welfare == None:
+                continue
+
+            if bestCell == None or welfare > bestWealth or (welfare == bestWealth and (travelDistance < bestRange or (travelDistance == bestRange and cellPositions[i] < bestPosition))):
+                bestCell = cell
+                bestWealth = welfare
+                bestRange = travelDistance
+                bestPosition = cellPositions[i]
+                if welfareBounds == None:
+                    welfareBounds = self.findWelfareBounds(aggression * combatMaxLoot, welfareCache)
+                    capacityClasses = self.cell.environment.cellCapacityClasses
+
+        if bestCell == None:
+            return self.cell
+        return bestCell
+
     def findBestFriend(self):
         if self.tags == None:
             return None
@@ -652,6 +739,31 @@ class Agent:
                 minHammingDistance = friend["hammingDistance"]
         return bestFriend
 
+    def findCellWelfare(self, cell, aggression, retaliators, welfareCache):
+        # Avoid attacking agents ineligible to attack
+        prey = cell.agent
+        if cell.isOccupied() and self.isNeighborValidPrey(prey) == False:
+            return None
+        combatMaxLoot = self.cell.environment.maxCombatLoot
+        preyTribe = prey.tribe if prey != None else "empty"
+        preySugar = prey.sugar if prey != None else 0
+        preySpice = prey.spice if prey != None else 0
+        # Aggression factor may lead agent to see more reward than possible meaning combat itself is a reward
+        welfarePreySugar = aggression * min(combatMaxLoot, preySugar)
+        welfarePreySpice = aggression * min(combatMaxLoot, preySpice)
+
+        # Modify value of cell relative to the metabolism needs of the agent
+        welfareRewards = (((cell.sugar + welfarePreySugar) / (1 + cell.pollution)), ((cell.spice + welfarePreySpice) / (1 + cell.pollution)))
+        welfare = welfareCache.get(welfareRewards)
+        if welfare == None:
+            welfare = self.findWelfare(welfareRewards[0], welfareRewards[1])
+            welfareCache[welfareRewards] = welfare
+
+        # Avoid attacking agents protected via retaliation
+        if prey != None and retaliators[preyTribe] > self.sugar + self.spice + welfare:
+            return None
+        return welfare
+
     def findCellsInRange(self, newCell=None):
         cell = self.cell if newCell == None else newCell
         vision = self.findVision()
@@ -661,8 +773,7 @@ class Agent:
         if cellRange <= 0:
             self.cellsInRange = allCells
             return allCells
-        for i in range(1, cellRange + 1):
-            allCells.update(cell.ranges[i])
+        allCells = cell.environment.findCellsInRange(cell.x, cell.y, cellRange)
         if newCell == None:
             self.cellsInRange = allCells
         return allCells
@@ -803,16 +914,18 @@ class Agent:
         return sugarDebt
 
     def findEmptyNeighborCells(self):
-        emptyCells = []
-        neighborCells = self.cell.neighbors.values()
-        for neighborCell in neighborCells:
-            if neighborCell.agent == None:
-                emptyCells.append(neighborCell)
-        return emptyCells
+        return self.cell.findEmptyNeighborCells()
+
+    def findEthicalNeighbors(self):
+        return None
+
+    def findEthicalValuesOfCells(self, cells, ethicalNeighbors=None):
+        return [self.findEthicalValueOfCell(cell) for cell in cells]
 
     def findFamilyHappiness(self):
         familyHappiness = 0
-        for child in self.socialNetwork["children"]:
+        for childID in self.socialNetwork["children"]:
+            child = self.socialGraph.findAgent(childID)
             if child.isAlive() == True:
                 if self.depressed == True:
                     familyHappiness += 0.5763
@@ -827,7 +940,8 @@ class Agent:
                         familyHappiness += 1
             else:
                 familyHappiness -= 1
-        for mate in self.socialNetwork["mates"]:
+        for mateID in self.socialNetwork["mates"]:
+            mate = self.socialGraph.findAgent(mateID)
             if mate.isAlive() == True:
                 familyHappiness += 1
                 if mate.isSick() == True:
@@ -839,12 +953,7 @@ class Agent:
     def findHammingDistanceInTags(self, neighbor):
         if self.tags == None:
             return 0
-        neighborTags = neighbor.tags
-        hammingDistance = 0
-        for i in range(len(self.tags)):
-            if self.tags[i] != neighborTags[i]:
-                hammingDistance += 1
-        return hammingDistance
+        return (self.tagBits ^ neighbor.tagBits).bit_count()
 
     def findHappiness(self):
         return self.conflictHappiness + self.familyHappiness + self.healthHappiness + self.socialHappiness + self.wealthHappiness
@@ -857,6 +966,14 @@ class Agent:
                 return 0.5763
             return 1
 
+    def findImmuneResponseMismatches(self, disease, startIndex):
+        diseaseLength = len(disease.tags)
+        immuneResponseLength = max(0, min(diseaseLength, len(self.immuneSystem) - startIndex))
+        immuneResponseMask = (1 << immuneResponseLength) - 1
+        mismatches = ((self.immuneSystemBits >> startIndex) & immuneResponseMask) ^ disease.tagBits
+        # Disease tags past the end of the immune system can never be matched
+        return mismatches | (((1 << diseaseLength) - 1) ^ immuneResponseMask)
+
     def findMarginalRateOfSubstitution(self):
         spiceMetabolism = self.findSpiceMetabolism()
         sugarMetabolism = self.findSugarMetabolism()
@@ -871,18 +988,18 @@ class Agent:
     def findNearestHammingDistanceInDisease(self, disease):
         if self.immuneSystem == None:
             return 0
-        diseaseTags = disease.tags
-        diseaseLength = len(diseaseTags)
+        diseaseLength = len(disease.tags)
+        diseaseMask = (1 << diseaseLength) - 1
         bestHammingDistance = diseaseLength
         bestRange = [0, diseaseLength - 1]
         for i in range(len(self.immuneSystem) - diseaseLength):
-            hammingDistance = 0
-            for j in range(diseaseLength):
-                if self.immuneSystem[i + j] != diseaseTags[j]:
-                    hammingDistance += 1
+            hammingDistance = (((self.immuneSystemBits >> i) & diseaseMask) ^ disease.tagBits).bit_count()
             if hammingDistance < bestHammingDistance:
                 bestHammingDistance = hammingDistance
                 bestRange = [i, i + (diseaseLength - 1)]
+                # No later window can be a closer match
+                if hammingDistance == 0:
+                    break
         diseaseStats = {"distance": bestHammingDistance, "start": bestRange[0], "end": bestRange[1]}
         return diseaseStats
 
@@ -901,6 +1018,13 @@ class Agent:
             self.neighborhood = neighborhood
         return neighborhood
 
+    def findNeighborhoodSize(self, newCell):
+        # Count the neighborhood the agent would have at a cell without building it
+        cellRange = min(self.findVision(), self.findMovement())
+        if cellRange <= 0:
+            return 1
+        return newCell.environment.findAgentsInRange(newCell.x, newCell.y, cellRange) + 1
+
     def findNewMarginalRateOfSubstitution(self, sugar, spice):
         spiceMetabolism = self.findSpiceMetabolism()
         sugarMetabolism = self.findSugarMetabolism()
@@ -916,6 +1040,41 @@ class Agent:
             return 1 / sugarMetabolism
         return spiceNeed / sugarNeed
 
+    def findPotentialCells(self):
+        self.findNeighborhood()
+        if len(self.cellsInRange) == 0:
+            return [(self.cell, 0, 0)]
+        cellsInRange = list(self.cellsInRange.items())
+        random.shuffle(cellsInRange)
+
+        retaliators = self.findRetaliatorsInVision()
+        aggression = self.findAggression()
+
+        bestCell = None
+        bestWealth = 0
+        bestRange = max(self.cell.environment.height, self.cell.environment.width)
+        potentialCells = []
+
+        # Agents sharing every input to their welfare share cell valuations for the rest of the timestep
+        welfareCache = self.cell.environment.welfareCache.setdefault(self.findWelfareClass(), {})
+
+        for cell, travelDistance in cellsInRange:
+            welfare = self.findCellWelfare(cell, aggression, retaliators, welfareCache)
+            if welfare == None:
+                continue
+
+            # Select closest cell with the most resources
+            if welfare > bestWealth or (welfare == bestWealth and travelDistance < bestRange):
+                bestCell = cell
+                bestWealth = welfare
+                bestRange = travelDistance
+
+            potentialCells.append((cell, welfare, travelDistance))
+
+        if len(potentialCells) == 0:
+            potentialCells.append((self.cell, 0, 0))
+        return potentialCells
+
     # TODO: Tally factors of hedons/dolors for given cell
     def findPotentialNiceOfCell(self, cell):
         potentialMates = []
@@ -977,34 +1136,44 @@ class Agent:
         return max(0, self.sugarMetabolism + self.sugarMetabolismModifier)
 
     def findTimeToLive(self, ageLimited=False):
-        spiceMetabolism = self.findSpiceMetabolism()
-        sugarMetabolism = self.findSugarMetabolism()
-        # If no sugar or spice metabolism, set days to death for that resource to seemingly infinite
-        sugarTimeToLive = self.sugar / sugarMetabolism if sugarMetabolism > 0 else sys.maxsize
-        spiceTimeToLive = self.spice / spiceMetabolism if spiceMetabolism > 0 else sys.maxsize
-        # If an agent has basic income, include the income for at least as many timesteps as they can already survive
-        if self.universalSugar != 0:
-            sugarIncome = (sugarTimeToLive * self.universalSugar) / self.cell.environment.universalSugarIncomeInterval
-            sugarTimeToLive = (self.sugar + sugarIncome) / sugarMetabolism if sugarMetabolism > 0 else sys.maxsize
-        if self.universalSpice != 0:
-            spiceIncome = (spiceTimeToLive * self.universalSpice) / self.cell.environment.universalSpiceIncomeInterval
-            spiceTimeToLive = (self.spice + spiceIncome) / spiceMetabolism if spiceMetabolism > 0 else sys.maxsize
-        timeToLive = min(sugarTimeToLive, spiceTimeToLive)
+        timeToLiveInputs = (self.sugar, self.spice, self.sugarMetabolism, self.spiceMetabolism, self.sugarMetabolismModifier, self.spiceMetabolismModifier, self.universalSugar, self.universalSpice)
+        if timeToLiveInputs != self.timeToLiveInputs:
+            self.timeToLive = self.findUnlimitedTimeToLive()
+            self.timeToLiveInputs = timeToLiveInputs
+        timeToLive = self.timeToLive
         if ageLimited == True:
             timeToLive = min(timeToLive, self.maxAge - self.age)
         return timeToLive
 
+    def findTopCellsByWealth(self, cells, count):
+        # Heap selection of the first cells sortCellsByWealth would return
+        return heapq.nsmallest(count, cells, key=lambda cell: (-cell[1], cell[2]))
+
     def findTribe(self):
         if self.tags == None:
             return None
         config = self.cell.environment.sugarscape.configuration
         numTribes = config["environmentMaxTribes"]
         possibleZeroes = config["agentTagStringLength"] + 1
-        self.tagZeroes = self.tags.count(0)
         tribeSize = possibleZeroes / numTribes
         tribe = min(math.ceil((self.tagZeroes + 1) / tribeSize) - 1, numTribes - 1)
         return tribe
 
+    def findUnlimitedTimeToLive(self):
+        spiceMetabolism = self.findSpiceMetabolism()
+        sugarMetabolism = self.findSugarMetabolism()
+        # If no sugar or spice metabolism, set days to death for that resource to seemingly infinite
+        sugarTimeToLive = self.sugar / sugarMetabolism if sugarMetabolism > 0 else sys.maxsize
+        spiceTimeToLive = self.spice / spiceMetabolism if spiceMetabolism > 0 else sys.maxsize
+        # If an agent has basic income, include the income for at least as many timesteps as they can already survive
+        if self.universalSugar != 0:
+            sugarIncome = (sugarTimeToLive * self.universalSugar) / self.cell.environment.universalSugarIncomeInterval
+            sugarTimeToLive = (self.sugar + sugarIncome) / sugarMetabolism if sugarMetabolism > 0 else sys.maxsize
+        if self.universalSpice != 0:
+            spiceIncome = (spiceTimeToLive * self.universalSpice) / self.cell.environment.universalSpiceIncomeInterval
+            spiceTimeToLive = (self.spice + spiceIncome) / spiceMetabolism if spiceMetabolism > 0 else sys.maxsize
+        return min(sugarTimeToLive, spiceTimeToLive)
+
     def findVision(self):
         return max(0, self.vision + self.visionModifier)
 
@@ -1036,8 +1205,6 @@ class Agent:
 
         welfare = (totalSugar ** sugarMetabolismProportion) * (totalSpice ** spiceMetabolismProportion)
         if self.tagPreferences == True and self.tags != None and len(self.tags) > 0:
-            # Tribe could have changed since last timestep, so recheck
-            self.tribe = self.findTribe()
             fractionZeroesInTags = self.tagZeroes / len(self.tags)
             fractionOnesInTags = 1 - fractionZeroesInTags
             tagPreferences = (sugarMetabolism * fractionZeroesInTags) + (spiceMetabolism * fractionOnesInTags)
@@ -1048,13 +1215,40 @@ class Agent:
             welfare = (totalSugar ** tagPreferencesSugar) * (totalSpice ** tagPreferencesSpice)
         return welfare
 
+    def findWelfareBounds(self, lootBound, welfareCache):
+        # Welfare never decreases with more resources, so a full unpolluted cell bounds the welfare of every cell with its capacities
+        cellCapacities = self.cell.environment.findCellCapacities()
+        if self.cell.environment.isPollutionNonnegative() == False:
+            return [math.inf for capacities in cellCapacities]
+        welfareBounds = []
+        for maxSugar, maxSpice in cellCapacities:
+            welfareRewards = (maxSugar + lootBound, maxSpice + lootBound)
+            welfare = welfareCache.get(welfareRewards)
+            if welfare == None:
+                welfare = self.findWelfare(welfareRewards[0], welfareRewards[1])
+                welfareCache[welfareRewards] = welfare
+            welfareBounds.append(welfare)
+        return welfareBounds
+
+    def findWelfareClass(self):
+        # Every input to findWelfare, so agents sharing a class can share its cell valuations
+        welfareClass = (self.findSugarMetabolism(), self.findSpiceMetabolism(), self.lookaheadFactor, self.sugar, self.spice)
+        if self.tagPreferences == True and self.tags != None and len(self.tags) > 0:
+            welfareClass += (self.tagZeroes, len(self.tags))
+        return welfareClass
+
     def flipTag(self, position, value):
+        if self.tags[position] == value:
+            return
         self.tags[position] = value
+        self.tagBits ^= 1 << position
+        self.tagZeroes += 1 if value == 0 else -1
+        self.tribe = self.findTribe()
 
     def gotoCell(self, cell):
         self.resetCell()
         self.cell = cell
-        self.cell.agent = self
+        self.cell.setAgent(self)
 
     def isAlive(self):
         if self.spice < 0 and self.sugar < 0:
@@ -1146,7 +1340,7 @@ class Agent:
 
     def payDebt(self, loan):
         creditorID = loan["creditor"]
-        creditor = self.socialNetwork[creditorID]["agent"]
+        creditor = self.socialGraph.findAgent(creditorID)
         if creditor.isAlive() == False:
             if creditor.inheritancePolicy != "children":
                 self.socialNetwork["creditors"].remove(loan)
@@ -1179,12 +1373,13 @@ class Agent:
 
     def payDebtToCreditorChildren(self, loan):
         creditorID = loan["creditor"]
-        creditor = self.socialNetwork[creditorID]["agent"]
+        creditor = self.socialGraph.findAgent(creditorID)
         creditorChildren = creditor.socialNetwork["children"]
         livingCreditorChildren = []
-        for child in creditorChildren:
+        for childID in creditorChildren:
+            child = self.socialGraph.findAgent(childID)
             # Children who took loans out with their parents should not owe themselves
-            if child != self and child.isAlive() == True:
+            if childID != self.ID and child.isAlive() == True:
                 livingCreditorChildren.append(child)
         numLivingChildren = len(livingCreditorChildren)
         if numLivingChildren > 0:
@@ -1198,72 +1393,28 @@ class Agent:
     def printCellScores(self, cells):
         i = 0
         while i < len(cells):
-            cell = cells[i]
-            cellString = f"({cell['cell'].x},{cell['cell'].y}) [{cell['wealth']},{cell['range']}]"
+            cell, wealth, cellRange = cells[i]
+            cellString = f"({cell.x},{cell.y}) [{wealth},{cellRange}]"
             print(f"Cell {i + 1}/{len(cells)}: {cellString}")
             i += 1
 
     def printEthicalCellScores(self, cells):
         i = 0
         while i < len(cells):
-            cell = cells[i]
-            cellString = f"({cell['cell'].x},{cell['cell'].y}) [{cell['wealth']},{cell['range']}]"
+            cell, wealth, cellRange = cells[i]
+            cellString = f"({cell.x},{cell.y}) [{wealth},{cellRange}]"
             print(f"Ethical cell {i + 1}/{len(cells)}: {cellString}")
             i += 1
 
     def rankCellsInRange(self):
-        self.findNeighborhood()
-        if len(self.cellsInRange) == 0:
-            return [{"cell": self.cell, "wealth": 0, "range": 0}]
-        cellsInRange = list(self.cellsInRange.items())
-        random.shuffle(cellsInRange)
-
-        retaliators = self.findRetaliatorsInVision()
-        combatMaxLoot = self.cell.environment.maxCombatLoot
-        aggression = self.findAggression()
-
-        bestCell = None
-        bestWealth = 0
-        bestRange = max(self.cell.environment.height, self.cell.environment.width)
-        potentialCells = []
-
-        for cell, travelDistance in cellsInRange:
-            # Avoid attacking agents ineligible to attack
-            prey = cell.agent
-            if cell.isOccupied() and self.isNeighborValidPrey(prey) == False:
-                continue
-            preyTribe = prey.tribe if prey != None else "empty"
-            preySugar = prey.sugar if prey != None else 0
-            preySpice = prey.spice if prey != None else 0
-            # Aggression factor may lead agent to see more reward than possible meaning combat itself is a reward
-            welfarePreySugar = aggression * min(combatMaxLoot, preySugar)
-            welfarePreySpice = aggression * min(combatMaxLoot, preySpice)
-
-            # Modify value of cell relative to the metabolism needs of the agent
-            welfare = self.findWelfare(((cell.sugar + welfarePreySugar) / (1 + cell.pollution)), ((cell.spice + welfarePreySpice) / (1 + cell.pollution)))
-
-            # Avoid attacking agents protected via retaliation
-            if prey != None and retaliators[preyTribe] > self.sugar + self.spice + welfare:
-                continue
-
-            # Select closest cell with the most resources
-            if welfare > bestWealth or (welfare == bestWealth and travelDistance < bestRange):
-                bestCell = cell
-                bestWealth = welfare
-                bestRange = travelDistance
-
-            cellRecord = {"cell": cell, "wealth": welfare, "range": travelDistance}
-            potentialCells.append(cellRecord)
-
-        if len(potentialCells) == 0:
-            potentialCells.append({"cell": self.cell, "wealth": 0, "range": 0})
-        rankedCells = self.sortCellsByWealth(potentialCells)
-        return rankedCells
+        return self.sortCellsByWealth(self.findPotentialCells())
 
     def removeDebt(self, loan):
         for debtor in self.socialNetwork["debtors"]:
             if debtor == loan:
                 self.socialNetwork["debtors"].remove(debtor)
+                if self.alive == False:
+                    self.socialGraph.removeAgent(self)
                 return
 
     def resetCell(self):
@@ -1271,28 +1422,23 @@ class Agent:
         self.cell = None
 
     def setFather(self, father):
-        fatherID = father.ID
-        if fatherID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(father)
-        self.socialNetwork["father"] = father
+        self.addAgentToSocialNetwork(father)
+        self.socialNetwork["father"] = father.ID
 
     def setMother(self, mother):
-        motherID = mother.ID
-        if motherID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(mother)
-        self.socialNetwork["mother"] = mother
+        self.addAgentToSocialNetwork(mother)
+        self.socialNetwork["mother"] = mother.ID
+
+    def setTags(self, tags):
+        self.tags = tags
+        # Tags are also packed into an integer with position i at bit i for Hamming distances by popcount
+        self.tagBits = sum(bit << i for i, bit in enumerate(self.tags)) if self.tags != None else None
+        self.tagZeroes = self.tags.count(0) if self.tags != None else 0
+        self.tribe = self.findTribe()
 
     def sortCellsByWealth(self, cells):
-        # Insertion sort of cells by wealth in descending order with range as a tiebreaker
-        i = 0
-        while i < len(cells):
-            j = i
-            while j > 0 and (cells[j - 1]["wealth"] < cells[j]["wealth"] or (cells[j - 1]["wealth"] == cells[j]["wealth"] and cells[j - 1]["range"] > cells[j]["range"])):
-                currCell = cells[j]
-                cells[j] = cells[j - 1]
-                cells[j - 1] = currCell
-                j -= 1
-            i += 1
+        # Stable sort of (cell, wealth, range) records by wealth in descending order with range as a tiebreaker
+        cells.sort(key=lambda cell: (-cell[1], cell[2]))
         return cells
 
     def spawnChild(self, childID, birthday, cell, configuration):
@@ -1323,7 +1469,7 @@ class Agent:
     def updateFriends(self, neighbor):
         neighborID = neighbor.ID
         neighborHammingDistance = self.findHammingDistanceInTags(neighbor)
-        neighborEntry = {"friend": neighbor, "hammingDistance": neighborHammingDistance}
+        neighborEntry = {"friend": neighborID, "hammingDistance": neighborHammingDistance}
         if len(self.socialNetwork["friends"]) < self.maxFriends:
             self.socialNetwork["friends"].append(neighborEntry)
         else:
@@ -1331,7 +1477,7 @@ class Agent:
             maxDifferenceFriend = None
             for friend in self.socialNetwork["friends"]:
                 # If already a friend, update Hamming Distance
-                if friend["friend"].ID == neighborID:
+                if friend["friend"] == neighborID:
                     self.socialNetwork["friends"].remove(friend)
                     self.socialNetwork["friends"].append(neighborEntry)
                     return
@@ -1353,10 +1499,19 @@ class Agent:
         self.wealthHappiness = self.findWealthHappiness()
         self.happiness = self.findHappiness()
 
+    def updateImmuneSystem(self, position, bit):
+        self.immuneSystem[position] = bit
+        self.immuneSystemBits ^= 1 << position
+        # Flipping a position toggles its mismatch in every disease record covering it
+        for diseaseRecord in self.diseases:
+            immuneResponseStart = diseaseRecord["startIndex"]
+            if immuneResponseStart <= position < immuneResponseStart + len(diseaseRecord["disease"].tags):
+                diseaseRecord["mismatches"] ^= 1 << (position - immuneResponseStart)
+
     def updateLoans(self):
         for debtor in self.socialNetwork["debtors"]:
             debtorID = debtor["debtor"]
-            debtorAgent = self.socialNetwork[debtorID]["agent"]
+            debtorAgent = self.socialGraph.findAgent(debtorID)
             # Cannot collect on debt since debtor is dead
             if debtorAgent.isAlive() == False:
                 self.socialNetwork["debtors"].remove(debtor)
@@ -1366,10 +1521,7 @@ class Agent:
                 self.payDebt(creditor)
 
     def updateMarginalRateOfSubstitutionForAgent(self, agent):
-        agentID = agent.ID
-        if agentID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(agent)
-        self.socialNetwork[agentID]["marginalRateOfSubstitution"] = agent.marginalRateOfSubstitution
+        self.addAgentToSocialNetwork(agent).marginalRateOfSubstitution = agent.marginalRateOfSubstitution
 
     def updateMeanIncome(self, sugarIncome, spiceIncome):
         # Define weight for moving average
@@ -1378,15 +1530,14 @@ class Agent:
         self.spiceMeanIncome = (alpha * spiceIncome) + ((1 - alpha) * self.spiceMeanIncome)
 
     def updateNeighbors(self):
-        self.neighbors = [neighborCell.agent for neighborCell in self.cell.neighbors.values() if neighborCell.agent != None]
+        self.neighbors = [neighborCell.agent for neighborCell in self.cell.findNeighborCells() if neighborCell.agent != None]
         self.updateSocialNetwork()
 
     def updateSocialNetwork(self):
         for neighbor in self.neighbors:
             if neighbor == None:
                 continue
-            neighborID = neighbor.ID
-            if neighborID in self.socialNetwork:
+            if self.socialGraph.findEdge(self.ID, neighbor.ID) != None:
                 self.updateTimesVisitedWithAgent(neighbor, self.lastMoved)
                 self.updateMarginalRateOfSubstitutionForAgent(neighbor)
             else:
@@ -1394,26 +1545,335 @@ class Agent:
             self.updateFriends(neighbor)
 
     def updateTimesReproducedWithAgent(self, agent, timestep):
-        agentID = agent.ID
-        if agentID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(agent)
-        self.socialNetwork[agentID]["timesReproduced"] += 1
-        self.socialNetwork[agentID]["lastSeen"] = timestep
+        socialEdge = self.addAgentToSocialNetwork(agent)
+        socialEdge.timesReproduced += 1
+        socialEdge.lastSeen = timestep
 
     def updateTimesTradedWithAgent(self, agent, timestep, transactions=0):
-        agentID = agent.ID
-        if agentID not in self.socialNetwork:
-            self.addAgentToSocialNetwork(agent)
-        self.socialNetwork[agentID]["timesTraded"] += transactions
-        self.socialNetwork[agentID]["lastSeen"] = timestep
+        socialEdge = self.addAgentToSocialNetwork(agent)
+        socialEdge.timesTraded += transactions
+        socialEdge.lastSeen = timestep
 
     def updateTimesVisitedWithAgent(self, agent, timestep):
-        agentID = agent.ID
-        if agentID not in self.socialNetwork:
+        socialEdge = self.socialGraph.findEdge(self.ID, agent.ID)
+        if socialEdge == None:
             self.addAgentToSocialNetwork(agent)
         else:
-            self.socialNetwork[agentID]["timesVisited"] += 1
-            self.socialNetwork[agentID]["lastSeen"] = timestep
+            socialEdge.timesVisited += 1
+            socialEdge.lastSeen = timestep
 
     def __str__(self):
         return f"{self.ID}"
+
+class ArrayAgent(Agent):
+    # Scalar agent state is read from and written to a row of the simulation's agent table
+    __slots__ = ("agentTable", "row")
+
+    def __init__(self, agentID, birthday, cell, configuration):
+        self.agentTable = cell.environment.sugarscape.agentTable
+        self.row = self.agentTable.addRow()
+        super().__init__(agentID, birthday, cell, configuration)
+
+    @property
+    def age(self):
+        return self.agentTable.columns["age"].item(self.row)
+
+    @age.setter
+    def age(self, age):
+        self.agentTable.columns["age"][self.row] = age
+
+    @property
+    def aggressionFactorModifier(self):
+        return self.agentTable.columns["aggressionFactorModifier"].item(self.row)
+
+    @aggressionFactorModifier.setter
+    def aggressionFactorModifier(self, aggressionFactorModifier):
+        self.agentTable.columns["aggressionFactorModifier"][self.row] = aggressionFactorModifier
+
+    @property
+    def alive(self):
+        return self.agentTable.columns["alive"].item(self.row)
+
+    @alive.setter
+    def alive(self, alive):
+        self.agentTable.columns["alive"][self.row] = alive
+
+    @property
+    def cell(self):
+        cellIndex = self.agentTable.columns["cell"].item(self.row)
+        return self.agentTable.environment.cells[cellIndex] if cellIndex >= 0 else None
+
+    @cell.setter
+    def cell(self, cell):
+        self.agentTable.columns["cell"][self.row] = cell.index if cell != None else -1
+
+    @property
+    def fertilityFactorModifier(self):
+        return self.agentTable.columns["fertilityFactorModifier"].item(self.row)
+
+    @fertilityFactorModifier.setter
+    def fertilityFactorModifier(self, fertilityFactorModifier):
+        self.agentTable.columns["fertilityFactorModifier"][self.row] = fertilityFactorModifier
+
+    @property
+    def movement(self):
+        return self.agentTable.columns["movement"].item(self.row)
+
+    @movement.setter
+    def movement(self, movement):
+        self.agentTable.columns["movement"][self.row] = movement
+
+    @property
+    def movementModifier(self):
+        return self.agentTable.columns["movementModifier"].item(self.row)
+
+    @movementModifier.setter
+    def movementModifier(self, movementModifier):
+        self.agentTable.columns["movementModifier"][self.row] = movementModifier
+
+    @property
+    def spice(self):
+        columns = self.agentTable.columns
+        spice = columns["spice"].item(self.row)
+        # Whole amounts set as integers read back as integers, as they would stay in the object model
+        return int(spice) if spice.is_integer() == True and columns["spiceInteger"].item(self.row) == True else spice
+
+    @spice.setter
+    def spice(self, spice):
+        columns = self.agentTable.columns
+        columns["spice"][self.row] = spice
+        columns["spiceInteger"][self.row] = isinstance(spice, int)
+
+    @property
+    def spiceMetabolism(self):
+        return self.agentTable.columns["spiceMetabolism"].item(self.row)
+
+    @spiceMetabolism.setter
+    def spiceMetabolism(self, spiceMetabolism):
+        self.agentTable.columns["spiceMetabolism"][self.row] = spiceMetabolism
+
+    @property
+    def spiceMetabolismModifier(self):
+        return self.agentTable.columns["spiceMetabolismModifier"].item(self.row)
+
+    @spiceMetabolismModifier.setter
+    def spiceMetabolismModifier(self, spiceMetabolismModifier):
+        self.agentTable.columns["spiceMetabolismModifier"][self.row] = spiceMetabolismModifier
+
+    @property
+    def sugar(self):
+        columns = self.agentTable.columns
+        sugar = columns["sugar"].item(self.row)
+        # Whole amounts set as integers read back as integers, as they would stay in the object model
+        return int(sugar) if sugar.is_integer() == True and columns["sugarInteger"].item(self.row) == True else sugar
+
+    @sugar.setter
+    def sugar(self, sugar):
+        columns = self.agentTable.columns
+        columns["sugar"][self.row] = sugar
+        columns["sugarInteger"][self.row] = isinstance(sugar, int)
+
+    @property
+    def sugarMetabolism(self):
+        return self.agentTable.columns["sugarMetabolism"].item(self.row)
+
+    @sugarMetabolism.setter
+    def sugarMetabolism(self, sugarMetabolism):
+        self.agentTable.columns["sugarMetabolism"][self.row] = sugarMetabolism
+
+    @property
+    def sugarMetabolismModifier(self):
+        return self.agentTable.columns["sugarMetabolismModifier"].item(self.row)
+
+    @sugarMetabolismModifier.setter
+    def sugarMetabolismModifier(self, sugarMetabolismModifier):
+        self.agentTable.columns["sugarMetabolismModifier"][self.row] = sugarMetabolismModifier
+
+    @property
+    def tribe(self):
+        tribe = self.agentTable.columns["tribe"].item(self.row)
+        return tribe if tribe >= 0 else None
+
+    @tribe.setter
+    def tribe(self, tribe):
+        self.agentTable.columns["tribe"][self.row] = tribe if tribe != None else -1
+
+    @property
+    def vision(self):
+        return self.agentTable.columns["vision"].item(self.row)
+
+    @vision.setter
+    def vision(self, vision):
+        self.agentTable.columns["vision"][self.row] = vision
+
+    @property
+    def visionModifier(self):
+        return self.agentTable.columns["visionModifier"].item(self.row)
+
+    @visionModifier.setter
+    def visionModifier(self, visionModifier):
+        self.agentTable.columns["visionModifier"][self.row] = visionModifier
+
+    def isAlive(self):
+        # Wealth is compared straight from the table, as its integer type does not matter here
+        columns = self.agentTable.columns
+        spice = columns["spice"].item(self.row)
+        sugar = columns["sugar"].item(self.row)
+        if spice < 0 and sugar < 0:
+            columns["alive"][self.row] = False
+        return columns["alive"].item(self.row) and spice >= 0 and sugar >= 0
+
+    def removeRow(self):
+        self.agentTable = self.agentTable.removeRow(self.row)
+        self.row = 0
+
+    def spawnChild(self, childID, birthday, cell, configuration):
+        return ArrayAgent(childID, birthday, cell, configuration)
+
+class AgentTable:
+    # Typed columns of scalar agent state with one row per agent, grown as agents are added
+    def __init__(self, environment, configuration, capacity=1024):
+        self.environment = environment
+        # Integer columns stay integers so agent ranges and metabolisms keep their types
+        columnTypes = {"age": numpy.int64, "alive": numpy.bool_, "cell": numpy.int64, "spice": numpy.float64, "sugar": numpy.float64, "tribe": numpy.int64,
+                       # Whether wealth was last set to an integer, so it reads back with the type the object model would have kept
+                       "spiceInteger": numpy.bool_, "sugarInteger": numpy.bool_,
+                       "movement": self.findColumnType(configuration["agentMovement"]),
+                       "spiceMetabolism": self.findColumnType(configuration["agentSpiceMetabolism"]),
+                       "sugarMetabolism": self.findColumnType(configuration["agentSugarMetabolism"]),
+                       "vision": self.findColumnType(configuration["agentVision"]),
+                       "aggressionFactorModifier": self.findColumnType(configuration["diseaseAggressionPenalty"]),
+                       "fertilityFactorModifier": self.findColumnType(configuration["diseaseFertilityPenalty"]),
+                       "movementModifier": self.findColumnType(configuration["diseaseMovementPenalty"]),
+                       "spiceMetabolismModifier": self.findColumnType(configuration["diseaseSpiceMetabolismPenalty"]),
+                       "sugarMetabolismModifier": self.findColumnType(configuration["diseaseSugarMetabolismPenalty"]),
+                       "visionModifier": self.findColumnType(configuration["diseaseVisionPenalty"])}
+        self.columns = {column: numpy.zeros(capacity, dtype=columnType) for column, columnType in columnTypes.items()}
+        self.freeRows = []
+        self.rows = 0
+
+    def addRow(self):
+        # Rows given up by removed agents are reused before the table grows
+        if len(self.freeRows) > 0:
+            row = self.freeRows.pop()
+            for column in self.columns.values():
+                column[row] = 0
+            return row
+        if self.rows == len(self.columns["age"]):
+            for column in self.columns:
+                self.columns[column] = numpy.concatenate((self.columns[column], numpy.zeros_like(self.columns[column])))
+        row = self.rows
+        self.rows += 1
+        return row
+
+    def findColumn(self, column, agents):
+        rows = numpy.fromiter((agent.row for agent in agents), dtype=numpy.int64, count=len(agents))
+        return self.columns[column][rows]
+
+    def findColumnType(self, valueRange):
+        if all(isinstance(value, int) for value in valueRange):
+            return numpy.int64
+        return numpy.float64
+
+    def removeRow(self, row):
+        # The row's final state moves to a table of its own, as dead agents may still be read through the social graph
+        rowTable = copy.copy(self)
+        rowTable.columns = {column: values[row:row + 1].copy() for column, values in self.columns.items()}
+        rowTable.freeRows = []
+        rowTable.rows = 1
+        self.freeRows.append(row)
+        return rowTable
+
+class AgentTombstone:
+    # Stands in for a dead agent once no outstanding loans depend on its full state, with nothing left to inherit or repay
+    __slots__ = ("ID", "alive", "cell", "inheritancePolicy", "socialNetwork", "spice", "sugar")
+
+    def __init__(self, agentID):
+        self.ID = agentID
+        self.alive = False
+        self.cell = None
+        self.inheritancePolicy = "none"
+        self.socialNetwork = {"father": None, "mother": None, "children": [], "friends": [], "creditors": [], "debtors": [], "mates": []}
+        self.spice = 0
+        self.sugar = 0
+
+    def isAlive(self):
+        return False
+
+    def removeDebt(self, loan):
+        return
+
+    def __str__(self):
+        return f"{self.ID}"
+
+class SocialEdge:
+    # Interaction counts an agent keeps about one acquaintance
+    __slots__ = ("lastSeen", "marginalRateOfSubstitution", "timesLoaned", "timesReproduced", "timesTraded", "timesVisited")
+
+    def __init__(self, lastSeen):
+        self.lastSeen = lastSeen
+        self.marginalRateOfSubstitution = 0
+        self.timesLoaned = 0
+        self.timesReproduced = 0
+        self.timesTraded = 0
+        self.timesVisited = 1
+
+class SocialGraph:
+    # Agents are only reachable by ID, so dead agents are released instead of being kept alive by the social networks of the living
+    def __init__(self, minEdgeLimit, maxEdgeAge):
+        self.agents = {}
+        self.edgeLimits = {}
+        self.edges = {}
+        self.maxEdgeAge = maxEdgeAge
+        self.minEdgeLimit = minEdgeLimit
+
+    def addAgent(self, agent):
+        self.agents[agent.ID] = agent
+        self.edgeLimits[agent.ID] = self.minEdgeLimit
+        self.edges[agent.ID] = {}
+
+    def addEdge(self, agentID, otherID, timestep):
+        edges = self.edges[agentID]
+        edge = edges.get(otherID)
+        if edge == None:
+            if len(edges) >= self.edgeLimits[agentID]:
+                self.removeStaleEdges(agentID, timestep)
+            edge = SocialEdge(timestep)
+            edges[otherID] = edge
+        return edge
+
+    def findAgent(self, agentID):
+        agent = self.agents.get(agentID)
+        if agent == None:
+            return AgentTombstone(agentID)
+        return agent
+
+    def findEdge(self, agentID, otherID):
+        return self.edges[agentID].get(otherID)
+
+    def findEdges(self, agentID):
+        return self.edges[agentID]
+
+    def removeAgent(self, agent):
+        # Agents short of resources are only dead once marked so, as isAlive reports them dead beforehand
+        if agent.alive == True or self.agents.get(agent.ID) != agent:
+            return
+        # Dead agents make no new acquaintances
+        if agent.ID in self.edges:
+            del self.edges[agent.ID]
+            del self.edgeLimits[agent.ID]
+        # Living debtors still repay dead creditors, or their children, through the creditor's full state
+        for loan in agent.socialNetwork["debtors"]:
+            if self.findAgent(loan["debtor"]).alive == True:
+                return
+        del self.agents[agent.ID]
+
+    def removeStaleEdges(self, agentID, timestep):
+        edges = self.edges[agentID]
+        # Acquaintances who have died are never seen again, and those not seen for a long time are met anew if seen again
+        # Agents are looked up directly, as findAgent would make a tombstone for every removed agent
+        for otherID in [otherID for otherID, edge in edges.items() if self.agents.get(otherID) == None or self.agents[otherID].alive == False
+                        or timestep - edge.lastSeen > self.maxEdgeAge]:
+            del edges[otherID]
+        # Sweep again only once the remaining acquaintances have doubled, so eviction is amortized constant time
+        self.edgeLimits[agentID] = max(self.minEdgeLimit, 2 * len(edges))
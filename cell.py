@@ -1,6 +1,9 @@
 import math
 
 class Cell:
+    # Resources and pollution are stored by each subclass, so none of them carries slots its properties shadow
+    __slots__ = ("agent", "environment", "hemisphere", "index", "timestep", "x", "y")
+
     def __init__(self, x, y, environment, maxSugar=0, maxSpice=0, growbackRate=0):
         self.x = x
         self.y = y
@@ -9,20 +12,21 @@ class Cell:
         self.maxSpice = maxSpice
 
         self.agent = None
-        self.hemisphere = "north" if self.x >= self.environment.equator else "south"
-        self.neighbors = {}
+        self.hemisphere = "north" if self.y < self.environment.equator else "south"
+        self.index = self.x * self.environment.height + self.y
         self.pollution = 0
-        self.pollutionFlux = 0
-        self.ranges = {}
-        self.season = None
         self.spice = maxSpice
         self.spiceLastProduced = 0
         self.sugar = maxSugar
         self.sugarLastProduced = 0
         self.timestep = 0
 
-    def doPollutionDiffusion(self):
-        self.pollution = self.pollutionFlux
+    @property
+    def season(self):
+        # Seasons are tracked per hemisphere by the environment
+        if self.hemisphere == "north":
+            return self.environment.seasonNorth
+        return self.environment.seasonSouth
 
     def doSpiceConsumptionPollution(self, spiceConsumed):
         consumptionPollutionFactor = self.environment.spiceConsumptionPollutionFactor
@@ -40,99 +44,53 @@ class Cell:
         productionPollutionFactor = self.environment.sugarProductionPollutionFactor
         self.pollution += productionPollutionFactor * sugarProduced
 
-    def findEastNeighbor(self):
-        if self.environment.wraparound == False and self.x + 1 > self.environment.width - 1:
-            return None
-        eastNeighbor = self.environment.findCell((self.x + 1 + self.environment.width) % self.environment.width, self.y)
-        return eastNeighbor
+    def findEmptyNeighborCells(self):
+        cells = self.environment.cells
+        cellOccupancy = self.environment.cellOccupancy
+        neighborCount = self.environment.neighborCount
+        neighborIndices = self.environment.cellNeighbors[self.index * neighborCount:(self.index + 1) * neighborCount]
+        return [cells[neighborIndex] for neighborIndex in neighborIndices if neighborIndex >= 0 and cellOccupancy[neighborIndex] == 0]
 
     def findNeighborAgents(self):
         agents = []
-        for neighbor in self.neighbors.values():
+        for neighbor in self.findNeighborCells():
             agent = neighbor.agent
             if agent != None:
                 agents.append(agent)
         return agents
 
-    def findNeighbors(self, mode):
-        self.neighbors = {}
-
-        north = self.findNorthNeighbor()
-        south = self.findSouthNeighbor()
-        east = self.findEastNeighbor()
-        west = self.findWestNeighbor()
-        if north is not None:
-            self.neighbors["north"] = north
-        if south is not None:
-            self.neighbors["south"] = south
-        if east is not None:
-            self.neighbors["east"] = east
-        if west is not None:
-            self.neighbors["west"] = west
-
-        if mode == "moore":
-            northeast = north.findEastNeighbor() if north is not None else None
-            northwest = north.findWestNeighbor() if north is not None else None
-            southeast = south.findEastNeighbor() if south is not None else None
-            southwest = south.findWestNeighbor() if south is not None else None
-            if northeast is not None:
-                self.neighbors["northeast"] = northeast
-            if northwest is not None:
-                self.neighbors["northwest"] = northwest
-            if southeast is not None:
-                self.neighbors["southeast"] = southeast
-            if southwest is not None:
-                self.neighbors["southwest"] = southwest
+    def findNeighborCells(self):
+        cells = self.environment.cells
+        neighborCount = self.environment.neighborCount
+        neighborIndices = self.environment.cellNeighbors[self.index * neighborCount:(self.index + 1) * neighborCount]
+        # Missing neighbors at the edges of an environment without wraparound are marked with -1
+        return [cells[neighborIndex] for neighborIndex in neighborIndices if neighborIndex >= 0]
 
     def findNeighborWealth(self):
-        neighborWealth = 0
-        for neighbor in self.neighbors.values():
-            if neighbor != None:
-                neighborWealth += neighbor.sugar + neighbor.spice
-        return neighborWealth
-
-    def findNorthNeighbor(self):
-        if self.environment.wraparound == False and self.y - 1 < 0:
-            return None
-        northNeighbor = self.environment.findCell(self.x, (self.y - 1 + self.environment.height) % self.environment.height)
-        return northNeighbor
-
-    def findPollutionFlux(self):
-        meanPollution = 0
-        for neighbor in self.neighbors.values():
-            meanPollution += neighbor.pollution
-        meanPollution = meanPollution / (len(self.neighbors))
-        self.pollutionFlux = meanPollution
-
-    def findSouthNeighbor(self):
-        if self.environment.wraparound == False and self.y + 1 < self.environment.height - 1:
-            return None
-        southNeighbor = self.environment.findCell(self.x, (self.y + 1 + self.environment.height) % self.environment.height)
-        return southNeighbor
-
-    def findWestNeighbor(self):
-        if self.environment.wraparound == False and self.x - 1 < 0:
-            return None
-        westNeighbor = self.environment.findCell((self.x - 1 + self.environment.width) % self.environment.width, self.y)
-        return westNeighbor
+        return self.environment.findNeighborWealth(self)
 
     def isOccupied(self):
         return self.agent != None
 
     def resetAgent(self):
         self.agent = None
+        self.environment.updateCellOccupancy(self)
 
     def resetSpice(self):
+        if self.environment.regrowingCells != None:
+            self.environment.addRegrowingCell(self)
         self.spice = 0
+        self.environment.updateNeighborWealth(self)
 
     def resetSugar(self):
+        if self.environment.regrowingCells != None:
+            self.environment.addRegrowingCell(self)
         self.sugar = 0
+        self.environment.updateNeighborWealth(self)
 
-    def updateSeason(self):
-        if self.season == "wet":
-            self.season = "dry"
-        else:
-            self.season = "wet"
+    def setAgent(self, agent):
+        self.agent = agent
+        self.environment.updateCellOccupancy(self)
 
     def __str__(self):
         string = ""
@@ -141,3 +99,129 @@ class Cell:
         else:
             string = f"{str(self.sugar)}/{str(self.spice)}"
         return string
+
+class ArrayCell(Cell):
+    # Cell state is read from and written to the environment's NumPy arrays
+    __slots__ = ()
+
+    @property
+    def maxSpice(self):
+        return self.environment.cellMaxSpice.item(self.x, self.y)
+
+    @maxSpice.setter
+    def maxSpice(self, maxSpice):
+        self.environment.cellMaxSpice[self.x, self.y] = maxSpice
+
+    @property
+    def maxSugar(self):
+        return self.environment.cellMaxSugar.item(self.x, self.y)
+
+    @maxSugar.setter
+    def maxSugar(self, maxSugar):
+        self.environment.cellMaxSugar[self.x, self.y] = maxSugar
+
+    @property
+    def pollution(self):
+        return self.environment.cellPollution.item(self.x, self.y)
+
+    @pollution.setter
+    def pollution(self, pollution):
+        self.environment.cellPollution[self.x, self.y] = pollution
+
+    @property
+    def spice(self):
+        return self.environment.cellSpice.item(self.x, self.y)
+
+    @spice.setter
+    def spice(self, spice):
+        self.environment.cellSpice[self.x, self.y] = spice
+
+    @property
+    def spiceLastProduced(self):
+        return self.environment.cellSpiceLastProduced.item(self.x, self.y)
+
+    @spiceLastProduced.setter
+    def spiceLastProduced(self, spiceLastProduced):
+        self.environment.cellSpiceLastProduced[self.x, self.y] = spiceLastProduced
+
+    @property
+    def sugar(self):
+        return self.environment.cellSugar.item(self.x, self.y)
+
+    @sugar.setter
+    def sugar(self, sugar):
+        self.environment.cellSugar[self.x, self.y] = sugar
+
+    @property
+    def sugarLastProduced(self):
+        return self.environment.cellSugarLastProduced.item(self.x, self.y)
+
+    @sugarLastProduced.setter
+    def sugarLastProduced(self, sugarLastProduced):
+        self.environment.cellSugarLastProduced[self.x, self.y] = sugarLastProduced
+
+class LazyCell(Cell):
+    # Resources are regrown on demand for every timestep since the cell was last touched
+    __slots__ = ("maxSpice", "maxSugar", "pollution", "storedSpice", "storedSpiceLastProduced", "storedSugar", "storedSugarLastProduced")
+
+    def __init__(self, x, y, environment, maxSugar=0, maxSpice=0, growbackRate=0):
+        self.storedSpice = maxSpice
+        self.storedSpiceLastProduced = 0
+        self.storedSugar = maxSugar
+        self.storedSugarLastProduced = 0
+        self.timestep = environment.timestep
+        super().__init__(x, y, environment, maxSugar, maxSpice, growbackRate)
+
+    @property
+    def spice(self):
+        self.updateResources()
+        return self.storedSpice
+
+    @spice.setter
+    def spice(self, spice):
+        self.updateResources()
+        self.storedSpice = spice
+
+    @property
+    def spiceLastProduced(self):
+        self.updateResources()
+        return self.storedSpiceLastProduced
+
+    @spiceLastProduced.setter
+    def spiceLastProduced(self, spiceLastProduced):
+        self.updateResources()
+        self.storedSpiceLastProduced = spiceLastProduced
+
+    @property
+    def sugar(self):
+        self.updateResources()
+        return self.storedSugar
+
+    @sugar.setter
+    def sugar(self, sugar):
+        self.updateResources()
+        self.storedSugar = sugar
+
+    @property
+    def sugarLastProduced(self):
+        self.updateResources()
+        return self.storedSugarLastProduced
+
+    @sugarLastProduced.setter
+    def sugarLastProduced(self, sugarLastProduced):
+        self.updateResources()
+        self.storedSugarLastProduced = sugarLastProduced
+
+    def updateResources(self):
+        timestep = self.environment.timestep
+        if self.timestep == timestep:
+            return
+        regrowthSteps = self.environment.findRegrowthSteps(self.hemisphere, self.timestep, timestep)
+        self.timestep = timestep
+        if regrowthSteps > 0:
+            self.storedSugar, self.storedSugarLastProduced = self.environment.findRegrowth(self.storedSugar, self.maxSugar, self.environment.sugarRegrowRate, regrowthSteps)
+            self.storedSpice, self.storedSpiceLastProduced = self.environment.findRegrowth(self.storedSpice, self.maxSpice, self.environment.spiceRegrowRate, regrowthSteps)
+
+class ObjectCell(Cell):
+    # Cell state is kept on the cell itself
+    __slots__ = ("maxSpice", "maxSugar", "pollution", "spice", "spiceLastProduced", "sugar", "sugarLastProduced")
@@ -2,6 +2,9 @@ import math
 import random
 
 class Disease:
+    __slots__ = ("ID", "aggressionPenalty", "configuration", "fertilityPenalty", "movementPenalty", "spiceMetabolismPenalty", "sugarMetabolismPenalty", "tagBits",
+                 "tags", "visionPenalty")
+
     def __init__(self, diseaseID, configuration):
         self.ID = diseaseID
         self.configuration = configuration
@@ -11,6 +14,8 @@ class Disease:
         self.spiceMetabolismPenalty = configuration["spiceMetabolismPenalty"]
         self.sugarMetabolismPenalty = configuration["sugarMetabolismPenalty"]
         self.tags = configuration["tags"]
+        # Tags are also packed into an integer with position i at bit i to match agent immune systems
+        self.tagBits = sum(bit << i for i, bit in enumerate(self.tags))
         self.visionPenalty = configuration["visionPenalty"]
 
     def __str__(self):
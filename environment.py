@@ -1,5 +1,14 @@
+import array
+import hashlib
+import json
 import math
+import mmap
+import os
 import random
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Environment:
     # Assumption: grid is always indexed by [width][height]
@@ -7,6 +16,7 @@ class Environment:
         self.width = width
         self.height = height
         self.sugarscape = sugarscape
+        self.cachePath = configuration["cachePath"]
         self.equator = configuration["equator"] if configuration["equator"] >= 0 else math.ceil(self.height / 2)
         self.globalMaxSpice = configuration["globalMaxSpice"]
         self.globalMaxSugar = configuration["globalMaxSugar"]
@@ -15,18 +25,21 @@ class Environment:
         self.pollutionDiffusionCountdown = configuration["pollutionDiffusionDelay"]
         self.pollutionDiffusionDelay = configuration["pollutionDiffusionDelay"]
         self.pollutionDiffusionEnd = configuration["pollutionDiffusionTimeframe"][1]
+        self.pollutionDiffusionKernel = self.findPollutionDiffusionKernel(configuration["pollutionDiffusionKernel"])
         self.pollutionDiffusionStart = configuration["pollutionDiffusionTimeframe"][0]
         self.pollutionEnd = configuration["pollutionTimeframe"][1]
         self.pollutionStart = configuration["pollutionTimeframe"][0]
         self.seasonalGrowbackCountdown = configuration["seasonalGrowbackDelay"]
         self.seasonalGrowbackDelay = configuration["seasonalGrowbackDelay"]
         self.seasonInterval = configuration["seasonInterval"]
+        self.regrowingHemispheres = ["north", "south"]
         self.seasonNorth = "wet" if configuration["seasonInterval"] > 0 else None
         self.seasonSouth = "dry" if configuration["seasonInterval"] > 0 else None
         self.seed = configuration["sugarscapeSeed"]
         self.spiceConsumptionPollutionFactor = configuration["spiceConsumptionPollutionFactor"]
         self.spiceProductionPollutionFactor = configuration["spiceProductionPollutionFactor"]
         self.spiceRegrowRate = configuration["spiceRegrowRate"]
+        self.storageMode = configuration["storageMode"]
         self.sugarConsumptionPollutionFactor = configuration["sugarConsumptionPollutionFactor"]
         self.sugarProductionPollutionFactor = configuration["sugarProductionPollutionFactor"]
         self.sugarRegrowRate = configuration["sugarRegrowRate"]
@@ -34,10 +47,98 @@ class Environment:
         self.universalSugarIncomeInterval = configuration["universalSugarIncomeInterval"]
         self.wraparound = configuration["wraparound"]
         self.maxCellDistance = 0
+        # Neighbors of every cell are stored as flat grid indices in a single table, with -1 marking missing neighbors
+        self.cellNeighbors = array.array('q')
+        self.neighborCount = len(self.findNeighborOffsets())
+        self.rangeMode = "cardinal"
+        self.rangeStencil = []
+        self.regrowthMode = configuration["regrowthMode"]
+        # Cells that may still change when regrown, with the wealth of all other cells kept as running totals
+        self.regrowingCells = {} if self.storageMode == "objects" else None
+        self.regrownWealthCreated = 0
+        self.regrownWealthTotal = 0
         self.timestep = 0
+        # Distinct pairs of cell capacities and the pair each cell has, found when first needed after the grid is configured
+        self.cellCapacities = None
+        self.cellCapacityClasses = None
+        self.welfareCache = {}
+        # Wealth of the neighbors of every cell, found when first needed in a timestep and updated as cells are harvested
+        self.neighborWealth = None
 
         # Populate grid with NoneType objects
         self.grid = [[None for j in range(height)]for i in range(width)]
+        self.cells = [None for i in range(width * height)]
+        # Occupancy of every cell, with the empty cells of each placement region kept in lists for constant-time sampling
+        self.cellOccupancy = bytearray(width * height)
+        # Occupied cells at each range ring around every cell, built when first needed and kept up to date as occupancy changes
+        self.ringOccupancy = None
+        self.ringOccupancyRange = 0
+        self.ringOffsets = None
+        self.cellRegions = array.array('q', [-1]) * (width * height)
+        self.emptyCellPositions = array.array('q', [-1]) * (width * height)
+        self.emptyRegionCells = []
+        if self.storageMode == "arrays":
+            self.createCellArrays()
+
+    def addEmptyCellRegion(self, cells):
+        region = len(self.emptyRegionCells)
+        emptyCells = []
+        for cell in cells:
+            self.cellRegions[cell.index] = region
+            if self.cellOccupancy[cell.index] == 0:
+                self.emptyCellPositions[cell.index] = len(emptyCells)
+                emptyCells.append(cell)
+        self.emptyRegionCells.append(emptyCells)
+        return region
+
+    def addRegrowingCell(self, cell):
+        if cell in self.regrowingCells:
+            return
+        self.regrownWealthCreated -= cell.sugarLastProduced + cell.spiceLastProduced
+        self.regrownWealthTotal -= cell.sugar + cell.spice
+        self.regrowingCells[cell] = None
+
+    def addSpiceCapacities(self, spiceCapacities):
+        self.cellCapacities = None
+        if self.storageMode == "arrays":
+            raisedCells = spiceCapacities > self.cellMaxSpice
+            numpy.copyto(self.cellMaxSpice, spiceCapacities, where=raisedCells)
+            numpy.copyto(self.cellSpice, spiceCapacities, where=raisedCells)
+            return
+        for i in range(self.width):
+            for j in range(self.height):
+                cellMaxCapacity = spiceCapacities[i][j]
+                if cellMaxCapacity > self.grid[i][j].maxSpice:
+                    self.grid[i][j].maxSpice = cellMaxCapacity
+                    self.grid[i][j].spice = cellMaxCapacity
+
+    def addSugarCapacities(self, sugarCapacities):
+        self.cellCapacities = None
+        if self.storageMode == "arrays":
+            raisedCells = sugarCapacities > self.cellMaxSugar
+            numpy.copyto(self.cellMaxSugar, sugarCapacities, where=raisedCells)
+            numpy.copyto(self.cellSugar, sugarCapacities, where=raisedCells)
+            return
+        for i in range(self.width):
+            for j in range(self.height):
+                cellMaxCapacity = sugarCapacities[i][j]
+                if cellMaxCapacity > self.grid[i][j].maxSugar:
+                    self.grid[i][j].maxSugar = cellMaxCapacity
+                    self.grid[i][j].sugar = cellMaxCapacity
+
+    def createCellArrays(self):
+        # Cell resources remain integers unless regrowth introduces fractional amounts
+        resourceType = numpy.int64 if isinstance(self.sugarRegrowRate, int) and isinstance(self.spiceRegrowRate, int) else numpy.float64
+        shape = (self.width, self.height)
+        self.cellMaxSpice = numpy.zeros(shape, dtype=resourceType)
+        self.cellMaxSugar = numpy.zeros(shape, dtype=resourceType)
+        self.cellPollution = numpy.zeros(shape, dtype=numpy.float64)
+        self.cellNorth = numpy.arange(self.height) < self.equator
+        self.cellNorth = numpy.broadcast_to(self.cellNorth, shape)
+        self.cellSpice = numpy.zeros(shape, dtype=resourceType)
+        self.cellSpiceLastProduced = numpy.zeros(shape, dtype=resourceType)
+        self.cellSugar = numpy.zeros(shape, dtype=resourceType)
+        self.cellSugarLastProduced = numpy.zeros(shape, dtype=resourceType)
 
     def createDistanceTable(self, maxDeltaX, maxDeltaY):
         distanceTable = {}
@@ -54,75 +155,191 @@ class Environment:
                 distanceTable[deltaPair] = math.sqrt(lowerDelta ** 2 + upperDelta ** 2)
         return distanceTable
 
+    def doArrayCellUpdate(self):
+        if len(self.regrowingHemispheres) == 0:
+            return
+        sugarRegrowth = numpy.minimum(self.cellSugar + self.sugarRegrowRate, self.cellMaxSugar)
+        spiceRegrowth = numpy.minimum(self.cellSpice + self.spiceRegrowRate, self.cellMaxSpice)
+        regrowingCells = True
+        if self.regrowingHemispheres == ["north"]:
+            regrowingCells = self.cellNorth
+        elif self.regrowingHemispheres == ["south"]:
+            regrowingCells = ~self.cellNorth
+        sugarProduced = numpy.where(self.cellSugar + self.sugarRegrowRate != self.cellSugar, self.sugarRegrowRate, 0)
+        spiceProduced = numpy.where(self.cellSpice + self.spiceRegrowRate != self.cellSpice, self.spiceRegrowRate, 0)
+        numpy.copyto(self.cellSugarLastProduced, sugarProduced, where=regrowingCells)
+        numpy.copyto(self.cellSpiceLastProduced, spiceProduced, where=regrowingCells)
+        numpy.copyto(self.cellSugar, sugarRegrowth, where=regrowingCells)
+        numpy.copyto(self.cellSpice, spiceRegrowth, where=regrowingCells)
+
+    def doArrayPollutionDiffusion(self):
+        pollution = self.cellPollution
+        pollutionFlux = numpy.zeros(pollution.shape, dtype=numpy.float64)
+        kernelWeights = numpy.zeros(pollution.shape, dtype=numpy.float64)
+        for deltaX, deltaY, weight in self.pollutionDiffusionKernel:
+            if self.wraparound == True:
+                pollutionFlux += weight * numpy.roll(pollution, (-deltaX, -deltaY), axis=(0, 1))
+                kernelWeights += weight
+                continue
+            if abs(deltaX) >= self.width or abs(deltaY) >= self.height:
+                continue
+            # Without wraparound, only the part of the grid with a neighbor at this offset receives its pollution
+            target = (slice(max(0, -deltaX), self.width - max(0, deltaX)), slice(max(0, -deltaY), self.height - max(0, deltaY)))
+            source = (slice(max(0, deltaX), self.width - max(0, -deltaX)), slice(max(0, deltaY), self.height - max(0, -deltaY)))
+            pollutionFlux[target] += weight * pollution[source]
+            kernelWeights[target] += weight
+        numpy.divide(pollutionFlux, kernelWeights, out=pollution, where=kernelWeights != 0)
+
     def doCellUpdate(self):
+        if self.storageMode == "arrays":
+            self.doArrayCellUpdate()
+        # Lazy cells regrow themselves when they are next read
+        elif self.regrowthMode == "eager":
+            self.doObjectCellUpdate()
+        if self.pollutionDiffusionStart <= self.timestep <= self.pollutionDiffusionEnd and self.pollutionDiffusionDelay > 0 and self.pollutionDiffusionCountdown == self.pollutionDiffusionDelay:
+            if self.storageMode == "arrays":
+                self.doArrayPollutionDiffusion()
+            else:
+                self.doObjectPollutionDiffusion()
+
+    def doObjectCellUpdate(self):
+        regrownCells = []
+        for cell in self.regrowingCells:
+            if cell.hemisphere not in self.regrowingHemispheres:
+                continue
+            cellCurrSugar = cell.sugar
+            cellCurrSpice = cell.spice
+            sugarRegrowth = min(cellCurrSugar + self.sugarRegrowRate, cell.maxSugar)
+            spiceRegrowth = min(cellCurrSpice + self.spiceRegrowRate, cell.maxSpice)
+            if cellCurrSugar + self.sugarRegrowRate != cellCurrSugar:
+                cell.sugarLastProduced = self.sugarRegrowRate
+            else:
+                cell.sugarLastProduced = 0
+            if cellCurrSpice + self.spiceRegrowRate != cellCurrSpice:
+                cell.spiceLastProduced = self.spiceRegrowRate
+            else:
+                cell.spiceLastProduced = 0
+            cell.sugar = sugarRegrowth
+            cell.spice = spiceRegrowth
+            if self.isCellRegrown(cell) == True:
+                regrownCells.append(cell)
+        self.removeRegrowingCells(regrownCells)
+
+    def doObjectPollutionDiffusion(self):
+        pollution = [[self.grid[i][j].pollution for j in range(self.height)] for i in range(self.width)]
         for i in range(self.width):
             for j in range(self.height):
-                cellCurrSugar = self.grid[i][j].sugar
-                cellCurrSpice = self.grid[i][j].spice
-                cellMaxSugar = self.grid[i][j].maxSugar
-                cellMaxSpice = self.grid[i][j].maxSpice
-                cellSeason = self.grid[i][j].season
-                sugarRegrowth = min(cellCurrSugar + self.sugarRegrowRate, cellMaxSugar)
-                spiceRegrowth = min(cellCurrSpice + self.spiceRegrowRate, cellMaxSpice)
-                if self.seasonInterval > 0:
-                    if self.timestep % self.seasonInterval == 0:
-                        self.grid[i][j].updateSeason()
-                    if (cellSeason == "wet") or (cellSeason == "dry" and self.seasonalGrowbackCountdown == self.seasonalGrowbackDelay):
-                        if self.grid[i][j].sugar + self.sugarRegrowRate != self.grid[i][j].sugar:
-                            self.grid[i][j].sugarLastProduced = self.sugarRegrowRate
-                        else:
-                            self.grid[i][j].sugarLastProduced = 0
-                        if self.grid[i][j].spice + self.spiceRegrowRate != self.grid[i][j].spice:
-                            self.grid[i][j].spiceLastProduced = self.spiceRegrowRate
-                        else:
-                            self.grid[i][j].spiceLastProduced = 0
-                        self.grid[i][j].sugar = sugarRegrowth
-                        self.grid[i][j].spice = spiceRegrowth
-                else:
-                    if self.grid[i][j].sugar + self.sugarRegrowRate != self.grid[i][j].sugar:
-                        self.grid[i][j].sugarLastProduced = self.sugarRegrowRate
-                    else:
-                        self.grid[i][j].sugarLastProduced = 0
-                    if self.grid[i][j].spice + self.spiceRegrowRate != self.grid[i][j].spice:
-                        self.grid[i][j].spiceLastProduced = self.spiceRegrowRate
-                    else:
-                        self.grid[i][j].spiceLastProduced = 0
-                    self.grid[i][j].sugar = sugarRegrowth
-                    self.grid[i][j].spice = spiceRegrowth
-        if self.pollutionDiffusionStart <= self.timestep <= self.pollutionDiffusionEnd and self.pollutionDiffusionDelay > 0 and self.pollutionDiffusionCountdown == self.pollutionDiffusionDelay:
-            for i in range(self.height):
-                for j in range(self.width):
-                    self.grid[i][j].findPollutionFlux()
-            for i in range(self.height):
-                for j in range(self.width):
-                    self.grid[i][j].doPollutionDiffusion()
+                pollutionFlux = 0
+                kernelWeights = 0
+                for deltaX, deltaY, weight in self.pollutionDiffusionKernel:
+                    x = i + deltaX
+                    y = j + deltaY
+                    if self.wraparound == True:
+                        x = x % self.width
+                        y = y % self.height
+                    elif x < 0 or x >= self.width or y < 0 or y >= self.height:
+                        continue
+                    pollutionFlux += weight * pollution[x][y]
+                    kernelWeights += weight
+                if kernelWeights != 0:
+                    self.grid[i][j].pollution = pollutionFlux / kernelWeights
 
     def doTimestep(self, timestep):
         self.timestep = timestep
+        self.welfareCache = {}
+        self.neighborWealth = None
         self.updateSeasons()
         self.updatePollution()
         self.doCellUpdate()
 
-    def findCardinalCellRanges(self, maxDeltaX, maxDeltaY, cellCoords):
-        numCells = self.width * self.height
-        for i in range(numCells):
-            x1, y1 = cellCoords[i]
-            for j in range(x1 + 1, x1 + maxDeltaX + 1):
-                deltaX = self.findWraparoundDistance(j - x1, self.width)
-                self.grid[x1][y1].ranges[deltaX][self.grid[j % self.width][y1]] = deltaX
-                self.grid[j % self.width][y1].ranges[deltaX][self.grid[x1][y1]] = deltaX
-            for j in range(y1 + 1, y1 + maxDeltaY + 1):
-                deltaY = self.findWraparoundDistance(j - y1, self.height)
-                self.grid[x1][y1].ranges[deltaY][self.grid[x1][j % self.height]] = deltaY
-                self.grid[x1][j % self.height].ranges[deltaY][self.grid[x1][y1]] = deltaY
+    def findAgentsInRange(self, x, y, cellRange):
+        cellRange = min(cellRange, self.maxCellDistance)
+        if self.ringOccupancy == None or cellRange > self.ringOccupancyRange:
+            self.findRingOccupancy(cellRange)
+        gridSize = self.width * self.height
+        cellIndex = x * self.height + y
+        agentsInRange = 0
+        for gridRange in range(1, cellRange + 1):
+            agentsInRange += self.ringOccupancy[gridRange * gridSize + cellIndex]
+        return agentsInRange
+
+    def findArrayNeighborWealth(self):
+        cellWealth = (self.cellSugar + self.cellSpice).ravel()
+        cellNeighbors = numpy.frombuffer(self.cellNeighbors, dtype=numpy.int64).reshape(-1, self.neighborCount)
+        # Neighbors are added one direction at a time so every cell sums its neighbors in the order it lists them
+        neighborWealth = numpy.zeros(cellWealth.shape, dtype=cellWealth.dtype)
+        for direction in range(self.neighborCount):
+            neighborIndices = cellNeighbors[:, direction]
+            neighborWealth += numpy.where(neighborIndices >= 0, cellWealth[neighborIndices], 0)
+        return neighborWealth.tolist()
+
+    def findCacheFile(self, maxSugar, maxSpice, sugarPeaks, spicePeaks):
+        config = self.sugarscape.configuration
+        # Key the cache on every option that shapes the landscape, the neighbor tables, or the range stencil
+        cacheConfiguration = {"agentMovement": config["agentMovement"], "agentMovementMode": config["agentMovementMode"], "agentVision": config["agentVision"],
+                              "agentVisionMode": config["agentVisionMode"], "cacheVersion": 2, "diseaseMovementPenalty": config["diseaseMovementPenalty"],
+                              "diseaseVisionPenalty": config["diseaseVisionPenalty"], "height": self.height, "maxSpice": maxSpice, "maxSugar": maxSugar,
+                              "neighborhoodMode": self.neighborhoodMode, "spicePeaks": spicePeaks, "startingDiseases": config["startingDiseases"],
+                              "sugarPeaks": sugarPeaks, "width": self.width, "wraparound": self.wraparound}
+        # Capacity maps are identified by their path and modification time
+        for mapOption in ["environmentSpiceMap", "environmentSugarMap"]:
+            if config[mapOption] != None:
+                cacheConfiguration[mapOption] = [config[mapOption], os.path.getmtime(config[mapOption])]
+        cacheKey = hashlib.md5(json.dumps(cacheConfiguration, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.cachePath, f"environment{cacheKey}.cache")
+
+    def findCardinalCellRanges(self, maxDeltaX, maxDeltaY):
+        rangeStencil = [[] for gridRange in range(self.maxCellDistance + 1)]
+        for gridRange in range(1, self.maxCellDistance + 1):
+            # Offsets are ordered west, north, east, south to match a sweep over the grid from its origin
+            if gridRange <= maxDeltaX:
+                rangeStencil[gridRange].append((-1 * gridRange, 0, gridRange))
+            if gridRange <= maxDeltaY:
+                rangeStencil[gridRange].append((0, -1 * gridRange, gridRange))
+            if gridRange <= maxDeltaX:
+                rangeStencil[gridRange].append((gridRange, 0, gridRange))
+            if gridRange <= maxDeltaY:
+                rangeStencil[gridRange].append((0, gridRange, gridRange))
+        return rangeStencil
 
     def findCell(self, x, y):
         return self.grid[x][y]
 
+    def findCellCapacities(self):
+        if self.cellCapacities == None:
+            if self.storageMode == "arrays":
+                cellCapacities = list(zip(self.cellMaxSugar.ravel().tolist(), self.cellMaxSpice.ravel().tolist()))
+            else:
+                cellCapacities = [(cell.maxSugar, cell.maxSpice) for cell in self.cells]
+            self.cellCapacities = sorted(set(cellCapacities))
+            capacityClasses = {capacities: i for i, capacities in enumerate(self.cellCapacities)}
+            self.cellCapacityClasses = array.array('q', [capacityClasses[capacities] for capacities in cellCapacities])
+        return self.cellCapacities
+
+    def findCellNeighborWealth(self, cellIndex):
+        neighborWealth = 0
+        for neighborIndex in self.cellNeighbors[cellIndex * self.neighborCount:(cellIndex + 1) * self.neighborCount]:
+            if neighborIndex >= 0:
+                neighbor = self.cells[neighborIndex]
+                neighborWealth += neighbor.sugar + neighbor.spice
+        return neighborWealth
+
     def findCellNeighbors(self):
+        neighborOffsets = self.findNeighborOffsets()
+        cellNeighbors = []
         for i in range(self.width):
             for j in range(self.height):
-                self.grid[i][j].findNeighbors(self.neighborhoodMode)
+                for deltaX, deltaY in neighborOffsets:
+                    neighborX = i + deltaX
+                    neighborY = j + deltaY
+                    if neighborX < 0 or neighborX >= self.width or neighborY < 0 or neighborY >= self.height:
+                        if self.wraparound == False:
+                            cellNeighbors.append(-1)
+                            continue
+                        neighborX = neighborX % self.width
+                        neighborY = neighborY % self.height
+                    cellNeighbors.append(neighborX * self.height + neighborY)
+        self.cellNeighbors = array.array('q', cellNeighbors)
 
     def findCellRanges(self):
         config = self.sugarscape.configuration
@@ -139,33 +356,175 @@ class Environment:
             maxRadialDelta = min(maxAgentRange, math.floor(math.sqrt((self.width - 1) ** 2 + (self.height - 1) ** 2)))
         maxCardinalDelta = max(maxDeltaX, maxDeltaY)
         self.maxCellDistance = maxRadialDelta if config["agentVisionMode"] == "radial" and config["agentMovementMode"] == "radial" else maxCardinalDelta
-        cellCoords = [(x, y) for x in range(self.width) for y in range(self.height)]
-        # Initialize ranges with all possible values
-        for x, y in cellCoords:
-            self.grid[x][y].ranges = {gridRange: {} for gridRange in range(1, self.maxCellDistance + 1)}
-
         if config["agentVisionMode"] == "radial" and config["agentMovementMode"] == "radial":
-            self.findRadialCellRanges(maxDeltaX, maxDeltaY, maxRadialDelta, cellCoords)
+            self.rangeMode = "radial"
+            self.rangeStencil = self.findRadialCellRanges(maxDeltaX, maxDeltaY, maxRadialDelta)
         else:
-            self.findCardinalCellRanges(maxDeltaX, maxDeltaY, cellCoords)
+            self.rangeMode = "cardinal"
+            self.rangeStencil = self.findCardinalCellRanges(maxDeltaX, maxDeltaY)
+
+    def findCellsInRange(self, x, y, cellRange):
+        cellsInRange = {}
+        for gridRange in range(1, min(cellRange, self.maxCellDistance) + 1):
+            rangeCells = []
+            wrapped = False
+            for deltaX, deltaY, distance in self.rangeStencil[gridRange]:
+                neighborX = x + deltaX
+                neighborY = y + deltaY
+                if neighborX < 0 or neighborX >= self.width or neighborY < 0 or neighborY >= self.height:
+                    if self.wraparound == False:
+                        continue
+                    neighborX = neighborX % self.width
+                    neighborY = neighborY % self.height
+                    wrapped = True
+                rangeCells.append((deltaX, deltaY, neighborX, neighborY, distance))
+            # Wrapped offsets break the stencil order, so restore the order a sweep over the grid would find them in
+            if wrapped == True:
+                rangeCells.sort(key=lambda rangeCell: self.findRangeOrder(x, y, rangeCell))
+            for deltaX, deltaY, neighborX, neighborY, distance in rangeCells:
+                cellsInRange[self.grid[neighborX][neighborY]] = distance
+        return cellsInRange
 
-    def findRadialCellRanges(self, maxDeltaX, maxDeltaY, maxDeltaRadius, cellCoords):
+    def findNeighborWealth(self, cell):
+        if self.neighborWealth == None:
+            # Array storage sums the whole grid at once, while object storage sums cells as they are first asked for
+            if self.storageMode == "arrays":
+                self.neighborWealth = self.findArrayNeighborWealth()
+            else:
+                self.neighborWealth = [None] * (self.width * self.height)
+        neighborWealth = self.neighborWealth[cell.index]
+        if neighborWealth == None:
+            neighborWealth = self.findCellNeighborWealth(cell.index)
+            self.neighborWealth[cell.index] = neighborWealth
+        return neighborWealth
+
+    def findNeighborOffsets(self):
+        # Neighbors are ordered north, south, east, west, followed by northeast, northwest, southeast, southwest
+        neighborOffsets = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+        if self.neighborhoodMode == "moore":
+            neighborOffsets += [(1, -1), (-1, -1), (1, 1), (-1, 1)]
+        return neighborOffsets
+
+    def findPollutionDiffusionKernel(self, kernel):
+        # Without a custom kernel, pollution diffuses evenly to the neighborhood in the order cells list their neighbors
+        if kernel == None:
+            return [(deltaX, deltaY, 1) for deltaX, deltaY in self.findNeighborOffsets()]
+        # Custom kernels are centered on the diffusing cell with rows running north to south and columns west to east
+        kernelHeight = len(kernel)
+        kernelWidth = len(kernel[0])
+        offsets = []
+        for row in range(kernelHeight):
+            for column in range(kernelWidth):
+                if kernel[row][column] != 0:
+                    offsets.append((column - kernelWidth // 2, row - kernelHeight // 2, kernel[row][column]))
+        return offsets
+
+    def findRadialCellRanges(self, maxDeltaX, maxDeltaY, maxDeltaRadius):
+        rangeStencil = [[] for gridRange in range(self.maxCellDistance + 1)]
         distanceTable = self.createDistanceTable(maxDeltaX, maxDeltaY)
-        numCells = self.width * self.height
-        for i in range(numCells):
-            x1, y1 = cellCoords[i]
-            for j in range(i + 1, numCells):
-                x2, y2 = cellCoords[j]
-                deltaX = self.findWraparoundDistance(x1 - x2, self.width)
-                deltaY = self.findWraparoundDistance(y1 - y2, self.height)
-                if deltaX > maxDeltaX or deltaY > maxDeltaY:
+        for deltaPair, distance in distanceTable.items():
+            gridRange = math.floor(distance)
+            if gridRange > maxDeltaRadius:
+                continue
+            lowerDelta, upperDelta = deltaPair
+            # Each delta pair covers every offset with the same magnitudes along either axis and in either direction
+            offsets = {(signX * deltaX, signY * deltaY) for deltaX, deltaY in [(lowerDelta, upperDelta), (upperDelta, lowerDelta)] for signX in [-1, 1] for signY in [-1, 1]}
+            for deltaX, deltaY in offsets:
+                if abs(deltaX) > maxDeltaX or abs(deltaY) > maxDeltaY:
+                    continue
+                # On a torus, offsets of half the grid in either direction reach the same cells
+                if self.wraparound == True and ((deltaX == -1 * maxDeltaX and 2 * maxDeltaX == self.width) or (deltaY == -1 * maxDeltaY and 2 * maxDeltaY == self.height)):
                     continue
-                deltaPair = tuple(sorted((deltaX, deltaY)))
-                distance = distanceTable[deltaPair]
-                gridRange = math.floor(distance)
-                if gridRange <= maxDeltaRadius:
-                    self.grid[x1][y1].ranges[gridRange][self.grid[x2][y2]] = distance
-                    self.grid[x2][y2].ranges[gridRange][self.grid[x1][y1]] = distance
+                rangeStencil[gridRange].append((deltaX, deltaY, distance))
+        for gridRange in range(self.maxCellDistance + 1):
+            rangeStencil[gridRange].sort()
+        return rangeStencil
+
+    def findRangeOrder(self, x, y, rangeCell):
+        deltaX, deltaY, neighborX, neighborY, distance = rangeCell
+        neighborIndex = neighborX * self.height + neighborY
+        if self.rangeMode == "radial":
+            return (neighborIndex, 0)
+        # Cardinal cells east and south of the origin cell are reached when the sweep visits the origin cell
+        if deltaX > 0:
+            return (x * self.height + y, 1)
+        if deltaY > 0:
+            return (x * self.height + y, 2)
+        return (neighborIndex, 0)
+
+    def findRegrowth(self, resource, maxResource, regrowRate, regrowthSteps):
+        # Regrow one timestep at a time so fractional amounts match those regrown every timestep
+        previousResource = resource
+        for step in range(regrowthSteps):
+            previousResource = resource
+            resource = min(resource + regrowRate, maxResource)
+            # Once a resource stops changing, every remaining timestep regrows it the same way
+            if resource == previousResource:
+                break
+        resourceProduced = regrowRate if previousResource + regrowRate != previousResource else 0
+        return resource, resourceProduced
+
+    def findRegrowthSteps(self, hemisphere, startTimestep, endTimestep):
+        if self.seasonInterval <= 0:
+            return endTimestep - startTimestep
+        # Cells regrow by the season they had at the start of a timestep, so seasons last a full interval starting from the first timestep
+        wetSeasonParity = 0 if hemisphere == "north" else 1
+        regrowthSteps = 0
+        timestep = startTimestep + 1
+        while timestep <= endTimestep:
+            seasonChanges = (timestep - 1) // self.seasonInterval
+            seasonEnd = min((seasonChanges + 1) * self.seasonInterval, endTimestep)
+            if seasonChanges % 2 == wetSeasonParity:
+                regrowthSteps += seasonEnd - timestep + 1
+            # Dry cells only regrow on timesteps where the seasonal growback delay is over
+            elif self.seasonalGrowbackDelay > 0:
+                regrowthSteps += seasonEnd // self.seasonalGrowbackDelay - (timestep - 1) // self.seasonalGrowbackDelay
+            timestep = seasonEnd + 1
+        return regrowthSteps
+
+    def findRingOccupancy(self, maxRange):
+        # Cells reach each other at the same range in either direction, so an occupied cell is counted by every cell its stencil reaches
+        # Only rings up to the largest range asked for are kept, as every occupancy change updates each of them
+        ringOffsets = {}
+        for gridRange in range(1, maxRange + 1):
+            for deltaX, deltaY, distance in self.rangeStencil[gridRange]:
+                # Wrapped offsets that reach the same cell are only counted once
+                offset = (deltaX % self.width, deltaY % self.height) if self.wraparound == True else (deltaX, deltaY)
+                if offset not in ringOffsets:
+                    ringOffsets[offset] = (deltaX, deltaY, gridRange)
+        self.ringOffsets = list(ringOffsets.values())
+        self.ringOccupancy = array.array('q', [0]) * ((maxRange + 1) * self.width * self.height)
+        self.ringOccupancyRange = maxRange
+        for cell in self.cells:
+            if self.cellOccupancy[cell.index] == 1:
+                self.updateRingOccupancy(cell, 1)
+
+    def findWealthCapacity(self):
+        if self.storageMode == "arrays":
+            return self.cellMaxSugar.sum().item() + self.cellMaxSpice.sum().item()
+        wealthCapacity = 0
+        for i in range(self.width):
+            for j in range(self.height):
+                wealthCapacity += self.grid[i][j].maxSugar + self.grid[i][j].maxSpice
+        return wealthCapacity
+
+    def findWealthCreated(self):
+        if self.storageMode == "arrays":
+            return self.cellSugarLastProduced.sum().item() + self.cellSpiceLastProduced.sum().item()
+        self.updateRegrowingCells()
+        wealthCreated = self.regrownWealthCreated
+        for cell in self.regrowingCells:
+            wealthCreated += cell.sugarLastProduced + cell.spiceLastProduced
+        return wealthCreated
+
+    def findWealthTotal(self):
+        if self.storageMode == "arrays":
+            return self.cellSugar.sum().item() + self.cellSpice.sum().item()
+        self.updateRegrowingCells()
+        wealthTotal = self.regrownWealthTotal
+        for cell in self.regrowingCells:
+            wealthTotal += cell.sugar + cell.spice
+        return wealthTotal
 
     def findWraparoundDistance(self, delta, border):
         delta = abs(delta)
@@ -173,16 +532,152 @@ class Environment:
             delta = border - delta
         return delta
 
+    def isCellRegrown(self, cell):
+        # A full cell whose last regrowth produced what regrowing at capacity does is unchanged by any further regrowth
+        if min(cell.maxSugar + self.sugarRegrowRate, cell.maxSugar) != cell.maxSugar or min(cell.maxSpice + self.spiceRegrowRate, cell.maxSpice) != cell.maxSpice:
+            return False
+        sugarProduced = self.sugarRegrowRate if cell.maxSugar + self.sugarRegrowRate != cell.maxSugar else 0
+        spiceProduced = self.spiceRegrowRate if cell.maxSpice + self.spiceRegrowRate != cell.maxSpice else 0
+        return cell.sugar == cell.maxSugar and cell.spice == cell.maxSpice and cell.sugarLastProduced == sugarProduced and cell.spiceLastProduced == spiceProduced
+
+    def isPollutionNonnegative(self):
+        # Pollution factors are never negative, but diffusion with negative kernel weights can leave cells with negative pollution
+        for deltaX, deltaY, weight in self.pollutionDiffusionKernel:
+            if weight < 0:
+                return False
+        return True
+
+    def loadCellCache(self, cacheFile):
+        if os.path.exists(cacheFile) == False or os.path.getsize(cacheFile) == 0:
+            return False
+        with open(cacheFile, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as cache:
+            itemSize = array.array('q').itemsize
+            headerLength = 6
+            if len(cache) < headerLength * itemSize:
+                return False
+            header = memoryview(cache)[:headerLength * itemSize].cast('q').tolist()
+            width, height, numDirections, maxCellDistance, radialRanges, rangeEntries = header
+            gridSize = width * height
+            sectionLengths = [gridSize, gridSize, gridSize * numDirections, maxCellDistance + 1, rangeEntries * 2, rangeEntries]
+            if width != self.width or height != self.height or numDirections != self.neighborCount or len(cache) != (headerLength + sum(sectionLengths)) * itemSize:
+                return False
+            sections = []
+            offset = headerLength * itemSize
+            for i in range(len(sectionLengths)):
+                # Capacities and range distances are stored as doubles, as capacities may be fractional in array storage
+                sectionFormat = 'd' if i < 2 or i == len(sectionLengths) - 1 else 'q'
+                section = memoryview(cache)[offset:offset + sectionLengths[i] * itemSize]
+                if self.storageMode == "arrays" and i < 2:
+                    sections.append(numpy.frombuffer(section, dtype=numpy.float64).reshape(width, height).copy())
+                elif i == 2:
+                    neighbors = array.array('q')
+                    neighbors.frombytes(section)
+                    sections.append(neighbors)
+                else:
+                    sections.append(section.cast(sectionFormat).tolist())
+                section.release()
+                offset += sectionLengths[i] * itemSize
+        maxSugar, maxSpice, neighbors, ringSizes, rangeDeltas, rangeDistances = sections
+
+        self.cellCapacities = None
+        if self.storageMode == "arrays":
+            self.cellMaxSugar[:] = maxSugar
+            self.cellSugar[:] = maxSugar
+            self.cellMaxSpice[:] = maxSpice
+            self.cellSpice[:] = maxSpice
+        else:
+            # Object storage keeps whole capacities as integers
+            maxSugar = [int(capacity) if capacity.is_integer() else capacity for capacity in maxSugar]
+            maxSpice = [int(capacity) if capacity.is_integer() else capacity for capacity in maxSpice]
+            for i in range(gridSize):
+                cell = self.cells[i]
+                cell.maxSugar = maxSugar[i]
+                cell.sugar = maxSugar[i]
+                cell.maxSpice = maxSpice[i]
+                cell.spice = maxSpice[i]
+        self.cellNeighbors = neighbors
+
+        self.maxCellDistance = maxCellDistance
+        self.rangeMode = "radial" if radialRanges == 1 else "cardinal"
+        self.rangeStencil = []
+        rangeEntry = 0
+        for ringSize in ringSizes:
+            ring = []
+            for i in range(rangeEntry, rangeEntry + ringSize):
+                distance = rangeDistances[i] if self.rangeMode == "radial" else int(rangeDistances[i])
+                ring.append((rangeDeltas[2 * i], rangeDeltas[2 * i + 1], distance))
+            self.rangeStencil.append(ring)
+            rangeEntry += ringSize
+        return True
+
+    def removeRegrowingCells(self, cells):
+        for cell in cells:
+            del self.regrowingCells[cell]
+            self.regrownWealthCreated += cell.sugarLastProduced + cell.spiceLastProduced
+            self.regrownWealthTotal += cell.sugar + cell.spice
+
     def resetCell(self, x, y):
         self.grid[x][y] = None
+        self.cells[x * self.height + y] = None
+
+    def saveCellCache(self, cacheFile):
+        rangeEntries = sum(len(ring) for ring in self.rangeStencil)
+        radialRanges = 1 if self.rangeMode == "radial" else 0
+        header = array.array('q', [self.width, self.height, self.neighborCount, self.maxCellDistance, radialRanges, rangeEntries])
+        capacities = array.array('d', [cell.maxSugar for cell in self.cells])
+        capacities.extend(cell.maxSpice for cell in self.cells)
+        cache = array.array('q', self.cellNeighbors)
+        cache.extend(len(ring) for ring in self.rangeStencil)
+        cache.extend(delta for ring in self.rangeStencil for deltaX, deltaY, distance in ring for delta in (deltaX, deltaY))
+        rangeDistances = array.array('d', [distance for ring in self.rangeStencil for deltaX, deltaY, distance in ring])
+        os.makedirs(self.cachePath, exist_ok=True)
+        # Write to a temporary file first so concurrent runs never read a partially written cache
+        temporaryFile = f"{cacheFile}.{os.getpid()}.tmp"
+        with open(temporaryFile, "wb") as file:
+            header.tofile(file)
+            capacities.tofile(file)
+            cache.tofile(file)
+            rangeDistances.tofile(file)
+        os.replace(temporaryFile, cacheFile)
 
     def setCell(self, cell, x, y):
         if self.grid[x][y] == None:
-            if y < self.equator:
-                cell.season = self.seasonNorth
-            else:
-                cell.season = self.seasonSouth
             self.grid[x][y] = cell
+            self.cells[x * self.height + y] = cell
+            self.cellCapacities = None
+            if self.regrowingCells != None:
+                self.regrowingCells[cell] = None
+
+    def updateCellOccupancy(self, cell):
+        occupied = 1 if cell.agent != None else 0
+        if self.cellOccupancy[cell.index] == occupied:
+            return
+        self.cellOccupancy[cell.index] = occupied
+        if self.ringOccupancy != None:
+            self.updateRingOccupancy(cell, 1 if occupied == 1 else -1)
+        region = self.cellRegions[cell.index]
+        if region < 0:
+            return
+        emptyCells = self.emptyRegionCells[region]
+        if occupied == 0:
+            self.emptyCellPositions[cell.index] = len(emptyCells)
+            emptyCells.append(cell)
+            return
+        # Fill the occupied cell's slot with the last empty cell of the region
+        position = self.emptyCellPositions[cell.index]
+        lastCell = emptyCells.pop()
+        if lastCell != cell:
+            emptyCells[position] = lastCell
+            self.emptyCellPositions[lastCell.index] = position
+        self.emptyCellPositions[cell.index] = -1
+
+    def updateNeighborWealth(self, cell):
+        if self.neighborWealth == None:
+            return
+        # Neighborhoods are symmetric, so only the neighbors of a changed cell count it in their neighbor wealth
+        for neighborIndex in self.cellNeighbors[cell.index * self.neighborCount:(cell.index + 1) * self.neighborCount]:
+            if neighborIndex >= 0:
+                self.neighborWealth[neighborIndex] = None
 
     def updatePollution(self):
         if self.pollutionDiffusionStart <= self.timestep <= self.pollutionDiffusionEnd and self.pollutionDiffusionDelay > 0:
@@ -191,12 +686,32 @@ class Environment:
             if self.pollutionDiffusionCountdown == 0:
                 self.pollutionDiffusionCountdown = self.pollutionDiffusionDelay
 
+    def updateRegrowingCells(self):
+        # Lazy cells only regrow when read, so cells may have finished regrowing since the last timestep
+        if self.regrowthMode == "lazy":
+            self.removeRegrowingCells([cell for cell in self.regrowingCells if self.isCellRegrown(cell) == True])
+
+    def updateRingOccupancy(self, cell, change):
+        gridSize = self.width * self.height
+        for deltaX, deltaY, gridRange in self.ringOffsets:
+            neighborX = cell.x + deltaX
+            neighborY = cell.y + deltaY
+            if neighborX < 0 or neighborX >= self.width or neighborY < 0 or neighborY >= self.height:
+                if self.wraparound == False:
+                    continue
+                neighborX = neighborX % self.width
+                neighborY = neighborY % self.height
+            self.ringOccupancy[gridRange * gridSize + neighborX * self.height + neighborY] += change
+
     def updateSeasons(self):
         if self.seasonInterval > 0:
             self.seasonalGrowbackCountdown -= 1
             # Seasonal growback delay over
             if self.seasonalGrowbackCountdown == 0:
                 self.seasonalGrowbackCountdown = self.seasonalGrowbackDelay
+            # Cells regrow according to the season their hemisphere had before this timestep's season change
+            hemisphereSeasons = [("north", self.seasonNorth), ("south", self.seasonSouth)]
+            self.regrowingHemispheres = [hemisphere for hemisphere, season in hemisphereSeasons if season == "wet" or (season == "dry" and self.seasonalGrowbackCountdown == self.seasonalGrowbackDelay)]
             if self.timestep % self.seasonInterval == 0:
                 if self.seasonNorth == "wet":
                     self.seasonNorth = "dry"
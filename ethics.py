@@ -1,103 +1,205 @@
 import agent
 
 import sys
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Bentham(agent.Agent):
+    __slots__ = ()
+
     def __init__(self, agentID, birthday, cell, configuration):
         super().__init__(agentID, birthday, cell, configuration)
 
-    def findEthicalValueOfCell(self, cell):
-        happiness = 0
-        unhappiness = 0
-        cellSiteWealth = cell.sugar + cell.spice
-        # Max combat loot for sugar and spice
-        globalMaxCombatLoot = cell.environment.maxCombatLoot * 2
-        cellMaxSiteWealth = cell.maxSugar + cell.maxSpice
-        if cell.agent != None:
-            agentWealth = cell.agent.sugar + cell.agent.spice
-            cellSiteWealth += min(agentWealth, globalMaxCombatLoot)
-            cellMaxSiteWealth += min(agentWealth, globalMaxCombatLoot)
-        cellNeighborWealth = cell.findNeighborWealth()
-        globalMaxWealth = cell.environment.globalMaxSugar + cell.environment.globalMaxSpice
-        cellValue = 0
+    def findArrayEthicalNeighbors(self, ethicalNeighbors):
+        # Neighbor attributes as columns, with the cells each neighbor can reach marked in a neighbors by grid matrix
+        neighbors = ethicalNeighbors["neighbors"]
+        environment = self.cell.environment
+        reachableCells = numpy.zeros((len(neighbors), environment.width * environment.height), dtype=bool)
+        for i in range(len(neighbors)):
+            neighborCell, neighborCellsInRange = neighbors[i][1], neighbors[i][2]
+            reachableCells[i, [cell.index for cell in neighborCellsInRange]] = True
+            reachableCells[i, neighborCell.index] = True
+        columns = {"neighborCells": numpy.array([ethicalNeighbor[1].index for ethicalNeighbor in neighbors], dtype=numpy.int64), "reachableCells": reachableCells}
+        for i, column in [(3, "metabolism"), (4, "intensity"), (5, "discount"), (6, "futureIntensity"), (7, "extent"), (8, "cellsInRange"), (9, "decisionModelFactor")]:
+            columns[column] = numpy.array([ethicalNeighbor[i] for ethicalNeighbor in neighbors], dtype=numpy.float64).reshape(-1, 1)
+        columns["opportunityCost"] = numpy.array([ethicalNeighbor[0] != self and self.selfishnessFactor < 1 for ethicalNeighbor in neighbors], dtype=bool).reshape(-1, 1)
+        if self.decisionModelTribalFactor >= 0:
+            columns["tribalFactor"] = numpy.array([ethicalNeighbor[10] for ethicalNeighbor in neighbors], dtype=numpy.float64).reshape(-1, 1)
+        if self.selfishnessFactor >= 0:
+            columns["selfishnessFactor"] = numpy.array([ethicalNeighbor[11] for ethicalNeighbor in neighbors], dtype=numpy.float64).reshape(-1, 1)
+        return columns
+
+    def findArrayEthicalValuesOfCells(self, cells, ethicalCells, ethicalNeighbors):
+        if ethicalNeighbors["columns"] == None:
+            ethicalNeighbors["columns"] = self.findArrayEthicalNeighbors(ethicalNeighbors)
+        columns = ethicalNeighbors["columns"]
+        # Neighbors run along the rows and cells along the columns, so every neighbor values the whole batch at once
+        cellIndices = numpy.array([cell.index for cell in cells], dtype=numpy.int64)
+        cellSiteWealth, cellMaxSiteWealth, cellPollution, cellNeighborWealth, futureNeighborhoodSize = numpy.array(ethicalCells, dtype=numpy.float64).reshape(-1, 5).T
+        certainty = columns["reachableCells"][:, cellIndices]
+        shape = certainty.shape
+        metabolism = columns["metabolism"]
+        hasMetabolism = metabolism > 0
+        hasMaxSiteWealth = numpy.broadcast_to(cellMaxSiteWealth > 0, shape)
+        timestepDistance = 1
+        cellDuration = numpy.divide(cellSiteWealth, metabolism, out=numpy.zeros(shape, dtype=numpy.float64), where=hasMetabolism)
+        proximity = 1 / timestepDistance
+        intensity = columns["intensity"] / (1 + cellPollution)
+        duration = numpy.divide(cellDuration, cellMaxSiteWealth, out=numpy.zeros(shape, dtype=numpy.float64), where=hasMaxSiteWealth)
+        futureDuration = numpy.where(hasMetabolism, numpy.divide(cellSiteWealth - metabolism, metabolism, out=numpy.zeros(shape, dtype=numpy.float64), where=hasMetabolism), cellSiteWealth)
+        futureDuration = numpy.divide(futureDuration, cellMaxSiteWealth, out=numpy.zeros(shape, dtype=numpy.float64), where=hasMaxSiteWealth)
+        futureIntensity = cellNeighborWealth / columns["futureIntensity"]
+        futureExtent = 1
+        if self.decisionModelLookaheadFactor != 0:
+            cellsInRange = columns["cellsInRange"]
+            futureExtent = numpy.divide(futureNeighborhoodSize, cellsInRange, out=numpy.ones(shape, dtype=numpy.float64), where=numpy.broadcast_to(cellsInRange > 0, shape))
+        extent = columns["extent"]
+        discount = columns["discount"]
+
+        neighborCellValues = self.findNeighborCellValue(columns["decisionModelFactor"], extent, 1, proximity, intensity, duration, discount, futureIntensity, futureDuration, futureExtent)
+        opportunityCost = columns["opportunityCost"]
+        if opportunityCost.any() == True:
+            # Other neighbors count the cell as an opportunity cost, or as a penalty if the move would take their own cell
+            opportunityCostValues = self.findNeighborCellValue(columns["decisionModelFactor"], extent, 1, proximity, -1 * intensity, -1 * duration, discount, -1 * futureIntensity, -1 * futureDuration, futureExtent)
+            penaltyValues = self.findNeighborCellValue(-1, extent, 1, proximity, intensity, duration, discount, futureIntensity, futureDuration, futureExtent)
+            penaltyValues = numpy.where(penaltyValues > -1, -1, penaltyValues)
+            neighborCellOccupied = columns["neighborCells"].reshape(-1, 1) == cellIndices
+            neighborCellValues = numpy.where(opportunityCost, numpy.where(neighborCellOccupied, penaltyValues, opportunityCostValues), neighborCellValues)
+
+        if "tribalFactor" in columns:
+            neighborCellValues = neighborCellValues * columns["tribalFactor"]
+        if "selfishnessFactor" in columns:
+            neighborCellValues = neighborCellValues * columns["selfishnessFactor"]
+        # Rows are added in neighbor order so each cell sums its neighbors in the same order as the object path
+        neighborCellValues = numpy.where(certainty, neighborCellValues, 0)
+        if self.selfishnessFactor < 0:
+            happiness = numpy.where(neighborCellValues > 0, neighborCellValues, 0).sum(axis=0)
+            unhappiness = numpy.where(neighborCellValues > 0, 0, neighborCellValues).sum(axis=0)
+            return [{"happiness": cellHappiness, "unhappiness": cellUnhappiness} for cellHappiness, cellUnhappiness in zip(happiness.tolist(), unhappiness.tolist())]
+        return neighborCellValues.sum(axis=0).tolist()
+
+    def findEthicalCells(self, cells):
+        # Attributes of each cell that do not depend on the neighbor valuing it
+        ethicalCells = []
+        for cell in cells:
+            cellSiteWealth = cell.sugar + cell.spice
+            # Max combat loot for sugar and spice
+            globalMaxCombatLoot = cell.environment.maxCombatLoot * 2
+            cellMaxSiteWealth = cell.maxSugar + cell.maxSpice
+            if cell.agent != None:
+                agentWealth = cell.agent.sugar + cell.agent.spice
+                cellSiteWealth += min(agentWealth, globalMaxCombatLoot)
+                cellMaxSiteWealth += min(agentWealth, globalMaxCombatLoot)
+            cellNeighborWealth = cell.findNeighborWealth()
+            # Future neighborhoods only count toward future extent when looking ahead
+            futureNeighborhoodSize = self.findNeighborhoodSize(cell) if self.decisionModelLookaheadFactor != 0 else 0
+            ethicalCells.append((cellSiteWealth, cellMaxSiteWealth, cell.pollution, cellNeighborWealth, futureNeighborhoodSize))
+        return ethicalCells
+
+    def findEthicalNeighbors(self):
+        # Attributes of each neighbor that do not depend on the cell being valued
+        globalMaxWealth = self.cell.environment.globalMaxSugar + self.cell.environment.globalMaxSpice
         neighborhoodSize = len(self.neighborhood)
-        futureNeighborhoodSize = len(self.findNeighborhood(cell))
+        ethicalNeighbors = []
         for neighbor in self.neighborhood:
-            certainty = 1 if neighbor.canReachCell(cell) == True else 0
-            # Skip if agent cannot reach cell
-            if certainty == 0:
-                continue
-            # Timesteps to reach cell, currently 1 since agents only plan for the current timestep
-            timestepDistance = 1
             neighborMetabolism = neighbor.sugarMetabolism + neighbor.spiceMetabolism
-            # If agent does not have metabolism, set duration to seemingly infinite
-            cellDuration = cellSiteWealth / neighborMetabolism if neighborMetabolism > 0 else 0
-            proximity = 1 / timestepDistance
-            intensity = (1 / (1 + neighbor.findTimeToLive()) / (1 + cell.pollution))
-            duration = cellDuration / cellMaxSiteWealth if cellMaxSiteWealth > 0 else 0
+            intensity = 1 / (1 + neighbor.findTimeToLive())
             # Agent discount, futureDuration, and futureIntensity implement Bentham's purity and fecundity
             discount = neighbor.decisionModelLookaheadDiscount
-            futureDuration = (cellSiteWealth - neighborMetabolism) / neighborMetabolism if neighborMetabolism > 0 else cellSiteWealth
-            futureDuration = futureDuration / cellMaxSiteWealth if cellMaxSiteWealth > 0 else 0
             # Normalize future intensity by number of adjacent cells
-            cellNeighbors = len(neighbor.cell.neighbors)
-            futureIntensity = cellNeighborWealth / (globalMaxWealth * cellNeighbors)
+            cellNeighbors = len(neighbor.cell.findNeighborCells())
+            futureIntensity = globalMaxWealth * cellNeighbors
             # Normalize extent by total cells in range
             cellsInRange = len(neighbor.cellsInRange)
             extent = neighborhoodSize / cellsInRange if cellsInRange > 0 else 1
-            futureExtent = futureNeighborhoodSize / cellsInRange if cellsInRange > 0 and self.decisionModelLookaheadFactor != 0 else 1
-            neighborCellValue = 0
-
-            # If not the agent moving, consider these as opportunity costs
-            if neighbor != self and cell != neighbor.cell and self.selfishnessFactor < 1:
-                duration = -1 * duration
-                intensity = -1 * intensity
-                futureDuration = -1 * futureDuration
-                futureIntensity = -1 * futureIntensity
-                if self.decisionModelLookaheadFactor == 0:
-                    neighborCellValue = neighbor.decisionModelFactor * ((extent * certainty * proximity) * ((intensity + duration) + (discount * (futureIntensity + futureDuration))))
-                else:
-                    neighborCellValue = neighbor.decisionModelFactor * ((certainty * proximity) * ((extent * (intensity + duration)) + (discount * (futureExtent * (futureIntensity + futureDuration)))))
-            # If move will kill this neighbor, consider this a penalty
-            elif neighbor != self and cell == neighbor.cell and self.selfishnessFactor < 1:
-                if self.decisionModelLookaheadFactor == 0:
-                    neighborCellValue = -1 * ((extent * certainty * proximity) * ((intensity + duration) + (discount * (futureIntensity + futureDuration))))
-                else:
-                    neighborCellValue = -1 * ((certainty * proximity) * ((extent * (intensity + duration)) + (discount * (futureExtent * (futureIntensity + futureDuration)))))
-                # If penalty is too slight, make it more severe
-                if neighborCellValue > -1:
-                    neighborCellValue = -1
-            else:
-                if self.decisionModelLookaheadFactor == 0:
-                    neighborCellValue = neighbor.decisionModelFactor * ((extent * certainty * proximity) * ((intensity + duration) + (discount * (futureIntensity + futureDuration))))
-                else:
-                    neighborCellValue = neighbor.decisionModelFactor * ((certainty * proximity) * ((extent * (intensity + duration)) + (discount * (futureExtent * (futureIntensity + futureDuration)))))
-
+            tribalFactor = None
             if self.decisionModelTribalFactor >= 0:
-                if neighbor.findTribe() == self.findTribe():
-                    neighborCellValue *= self.decisionModelTribalFactor
-                else:
-                    neighborCellValue *= 1 - self.decisionModelTribalFactor
+                tribalFactor = self.decisionModelTribalFactor if neighbor.tribe == self.tribe else 1 - self.decisionModelTribalFactor
+            selfishnessFactor = None
             if self.selfishnessFactor >= 0:
-                if neighbor == self:
-                    neighborCellValue *= self.selfishnessFactor
+                selfishnessFactor = self.selfishnessFactor if neighbor == self else 1 - self.selfishnessFactor
+            ethicalNeighbors.append((neighbor, neighbor.cell, neighbor.cellsInRange, neighborMetabolism, intensity, discount, futureIntensity, extent, cellsInRange, neighbor.decisionModelFactor, tribalFactor, selfishnessFactor))
+        # Array columns are built when first needed by a batch large enough to be valued with NumPy
+        return {"columns": None, "neighbors": ethicalNeighbors}
+
+    def findEthicalValueOfCell(self, cell):
+        return self.findEthicalValuesOfCells([cell])[0]
+
+    def findEthicalValuesOfCells(self, cells, ethicalNeighbors=None):
+        # Neighbor attributes are gathered once per decision and cell attributes once per batch
+        if ethicalNeighbors == None:
+            ethicalNeighbors = self.findEthicalNeighbors()
+        ethicalCells = self.findEthicalCells(cells)
+        # Small batches are cheaper to value one neighbor and cell at a time than to set up as arrays
+        if numpy != None and len(cells) * len(ethicalNeighbors["neighbors"]) >= 512:
+            return self.findArrayEthicalValuesOfCells(cells, ethicalCells, ethicalNeighbors)
+        return self.findObjectEthicalValuesOfCells(cells, ethicalCells, ethicalNeighbors)
+
+    def findNeighborCellValue(self, decisionModelFactor, extent, certainty, proximity, intensity, duration, discount, futureIntensity, futureDuration, futureExtent):
+        if self.decisionModelLookaheadFactor == 0:
+            return decisionModelFactor * ((extent * certainty * proximity) * ((intensity + duration) + (discount * (futureIntensity + futureDuration))))
+        return decisionModelFactor * ((certainty * proximity) * ((extent * (intensity + duration)) + (discount * (futureExtent * (futureIntensity + futureDuration)))))
+
+    def findObjectEthicalValuesOfCells(self, cells, ethicalCells, ethicalNeighbors):
+        ethicalValues = []
+        for cell, (cellSiteWealth, cellMaxSiteWealth, cellPollution, cellNeighborWealth, futureNeighborhoodSize) in zip(cells, ethicalCells):
+            happiness = 0
+            unhappiness = 0
+            cellValue = 0
+            for neighbor, neighborCell, neighborCellsInRange, neighborMetabolism, neighborIntensity, discount, neighborFutureIntensity, extent, cellsInRange, decisionModelFactor, tribalFactor, selfishnessFactor in ethicalNeighbors["neighbors"]:
+                # Skip if agent cannot reach cell
+                if cell != neighborCell and cell not in neighborCellsInRange:
+                    continue
+                certainty = 1
+                # Timesteps to reach cell, currently 1 since agents only plan for the current timestep
+                timestepDistance = 1
+                # If agent does not have metabolism, set duration to seemingly infinite
+                cellDuration = cellSiteWealth / neighborMetabolism if neighborMetabolism > 0 else 0
+                proximity = 1 / timestepDistance
+                intensity = neighborIntensity / (1 + cellPollution)
+                duration = cellDuration / cellMaxSiteWealth if cellMaxSiteWealth > 0 else 0
+                futureDuration = (cellSiteWealth - neighborMetabolism) / neighborMetabolism if neighborMetabolism > 0 else cellSiteWealth
+                futureDuration = futureDuration / cellMaxSiteWealth if cellMaxSiteWealth > 0 else 0
+                futureIntensity = cellNeighborWealth / neighborFutureIntensity
+                futureExtent = futureNeighborhoodSize / cellsInRange if cellsInRange > 0 and self.decisionModelLookaheadFactor != 0 else 1
+                neighborCellValue = 0
+
+                # If not the agent moving, consider these as opportunity costs
+                if neighbor != self and cell != neighborCell and self.selfishnessFactor < 1:
+                    neighborCellValue = self.findNeighborCellValue(decisionModelFactor, extent, certainty, proximity, -1 * intensity, -1 * duration, discount, -1 * futureIntensity, -1 * futureDuration, futureExtent)
+                # If move will kill this neighbor, consider this a penalty
+                elif neighbor != self and cell == neighborCell and self.selfishnessFactor < 1:
+                    neighborCellValue = self.findNeighborCellValue(-1, extent, certainty, proximity, intensity, duration, discount, futureIntensity, futureDuration, futureExtent)
+                    # If penalty is too slight, make it more severe
+                    if neighborCellValue > -1:
+                        neighborCellValue = -1
                 else:
-                    neighborCellValue *= 1 - self.selfishnessFactor
-            else:
-                if neighborCellValue > 0:
-                    happiness += neighborCellValue
+                    neighborCellValue = self.findNeighborCellValue(decisionModelFactor, extent, certainty, proximity, intensity, duration, discount, futureIntensity, futureDuration, futureExtent)
+
+                if tribalFactor != None:
+                    neighborCellValue *= tribalFactor
+                if selfishnessFactor != None:
+                    neighborCellValue *= selfishnessFactor
                 else:
-                    unhappiness += neighborCellValue
-            cellValue += neighborCellValue
+                    if neighborCellValue > 0:
+                        happiness += neighborCellValue
+                    else:
+                        unhappiness += neighborCellValue
+                cellValue += neighborCellValue
 
-        if self.selfishnessFactor < 0:
-            return {"happiness": happiness, "unhappiness": unhappiness}
-        return cellValue
+            if self.selfishnessFactor < 0:
+                ethicalValues.append({"happiness": happiness, "unhappiness": unhappiness})
+            else:
+                ethicalValues.append(cellValue)
+        return ethicalValues
 
     def spawnChild(self, childID, birthday, cell, configuration):
         return Bentham(childID, birthday, cell, configuration)
 
 class Leader(agent.Agent):
+    # The single leader keeps an attribute dictionary, as its array counterpart cannot also inherit the array agent slots
     def __init__(self, agentID, birthday, cell, configuration):
         super().__init__(agentID, birthday, cell, configuration)
         # Special leader agent should be configured to be immortal and omniscient
@@ -124,8 +226,7 @@ class Leader(agent.Agent):
         agentsByNeed = sorted(agentsByNeed, key=lambda agent: agent["ttl"])
         for agentRecord in agentsByNeed:
             agent = agentRecord["agent"]
-            for cellRecord in agentRecord["cells"]:
-                cell = cellRecord["cell"]
+            for cell, wealth, cellRange in agentRecord["cells"]:
                 if self.grid[cell.x][cell.y] == None:
                     self.grid[cell.x][cell.y] = agent
                     self.agentPlacements[agent.ID] = self.cell.environment.grid[cell.x][cell.y]
@@ -150,3 +251,38 @@ class Leader(agent.Agent):
 
     def spawnChild(self, childID, birthday, cell, configuration):
         return Leader(childID, birthday, cell, configuration)
+
+class ArrayBentham(agent.ArrayAgent, Bentham):
+    __slots__ = ()
+
+    def __init__(self, agentID, birthday, cell, configuration):
+        super().__init__(agentID, birthday, cell, configuration)
+
+    def spawnChild(self, childID, birthday, cell, configuration):
+        return ArrayBentham(childID, birthday, cell, configuration)
+
+class ArrayLeader(agent.ArrayAgent, Leader):
+    def __init__(self, agentID, birthday, cell, configuration):
+        super().__init__(agentID, birthday, cell, configuration)
+
+    # The leader's wealth of sys.maxsize is beyond what the float64 wealth columns hold exactly, so it is kept on the instance as well
+    @property
+    def spice(self):
+        return self.leaderSpice
+
+    @spice.setter
+    def spice(self, spice):
+        self.leaderSpice = spice
+        agent.ArrayAgent.spice.fset(self, spice)
+
+    @property
+    def sugar(self):
+        return self.leaderSugar
+
+    @sugar.setter
+    def sugar(self, sugar):
+        self.leaderSugar = sugar
+        agent.ArrayAgent.sugar.fset(self, sugar)
+
+    def spawnChild(self, childID, birthday, cell, configuration):
+        return ArrayLeader(childID, birthday, cell, configuration)
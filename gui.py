@@ -440,27 +440,27 @@ class GUI:
         elif self.activeNetwork.get() == "Family":
             for agent in self.sugarscape.agents:
                 family = [agent.socialNetwork["mother"], agent.socialNetwork["father"]] + agent.socialNetwork["children"]
-                for familyMember in family:
-                    if familyMember != None and familyMember.isAlive() == True:
+                for familyMemberID in family:
+                    if familyMemberID == None:
+                        continue
+                    familyMember = self.sugarscape.socialGraph.findAgent(familyMemberID)
+                    if familyMember.isAlive() == True:
                         lineEndpointsPair = frozenset([(agent.cell.x, agent.cell.y), (familyMember.cell.x, familyMember.cell.y)])
                         lineCoordinates.add(lineEndpointsPair)
 
         elif self.activeNetwork.get() == "Friends":
             for agent in self.sugarscape.agents:
                 for friendRecord in agent.socialNetwork["friends"]:
-                    friend = friendRecord["friend"]
+                    friend = self.sugarscape.socialGraph.findAgent(friendRecord["friend"])
                     if friend.isAlive() == True:
                         lineEndpointsPair = frozenset([(agent.cell.x, agent.cell.y), (friend.cell.x, friend.cell.y)])
                         lineCoordinates.add(lineEndpointsPair)
 
         elif self.activeNetwork.get() == "Trade":
             for agent in self.sugarscape.agents:
-                for label in agent.socialNetwork:
-                    if isinstance(label, str):
-                        continue
-                    trader = agent.socialNetwork[label]
-                    if trader != None and trader["agent"].isAlive() == True and trader["lastSeen"] == self.sugarscape.timestep and trader["timesTraded"] > 0:
-                        trader = trader["agent"]
+                for traderID, socialEdge in self.sugarscape.socialGraph.findEdges(agent.ID).items():
+                    trader = self.sugarscape.socialGraph.findAgent(traderID)
+                    if trader.isAlive() == True and socialEdge.lastSeen == self.sugarscape.timestep and socialEdge.timesTraded > 0:
                         lineEndpointsPair = frozenset([(agent.cell.x, agent.cell.y), (trader.cell.x, trader.cell.y)])
                         lineCoordinates.add(lineEndpointsPair)
 
@@ -468,7 +468,7 @@ class GUI:
             for agent in self.sugarscape.agents:
                 # Loan records are always kept on both sides, so only one side is needed
                 for loanRecord in agent.socialNetwork["creditors"]:
-                    creditor = agent.socialNetwork[loanRecord["creditor"]]["agent"]
+                    creditor = self.sugarscape.socialGraph.findAgent(loanRecord["creditor"])
                     if creditor.isAlive() == True:
                         lineEndpointsPair = frozenset([(agent.cell.x, agent.cell.y), (creditor.cell.x, creditor.cell.y)])
                         lineCoordinates.add(lineEndpointsPair)
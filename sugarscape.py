@@ -6,12 +6,18 @@ import disease
 import environment
 import ethics
 
+import array
 import getopt
 import hashlib
 import json
 import math
+import os
 import random
 import sys
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 class Sugarscape:
     def __init__(self, configuration):
@@ -22,19 +28,23 @@ class Sugarscape:
         self.timestep = 0
         self.nextAgentID = 0
         self.nextDiseaseID = 0
-        environmentConfiguration = {"equator": configuration["environmentEquator"],
+        environmentConfiguration = {"cachePath": configuration["environmentCachePath"],
+                                    "equator": configuration["environmentEquator"],
                                     "globalMaxSpice": configuration["environmentMaxSpice"],
                                     "globalMaxSugar": configuration["environmentMaxSugar"],
                                     "maxCombatLoot": configuration["environmentMaxCombatLoot"],
                                     "neighborhoodMode": configuration["neighborhoodMode"],
                                     "pollutionDiffusionDelay": configuration["environmentPollutionDiffusionDelay"],
+                                    "pollutionDiffusionKernel": configuration["environmentPollutionDiffusionKernel"],
                                     "pollutionDiffusionTimeframe": configuration["environmentPollutionDiffusionTimeframe"],
                                     "pollutionTimeframe": configuration["environmentPollutionTimeframe"],
+                                    "regrowthMode": configuration["environmentRegrowthMode"],
                                     "seasonalGrowbackDelay": configuration["environmentSeasonalGrowbackDelay"],
                                     "seasonInterval": configuration["environmentSeasonInterval"],
                                     "spiceConsumptionPollutionFactor": configuration["environmentSpiceConsumptionPollutionFactor"],
                                     "spiceProductionPollutionFactor": configuration["environmentSpiceProductionPollutionFactor"],
                                     "spiceRegrowRate": configuration["environmentSpiceRegrowRate"],
+                                    "storageMode": configuration["environmentStorageMode"],
                                     "sugarConsumptionPollutionFactor": configuration["environmentSugarConsumptionPollutionFactor"],
                                     "sugarProductionPollutionFactor": configuration["environmentSugarProductionPollutionFactor"],
                                     "sugarRegrowRate": configuration["environmentSugarRegrowRate"],
@@ -46,16 +56,19 @@ class Sugarscape:
         self.environment = environment.Environment(configuration["environmentHeight"], configuration["environmentWidth"], self, environmentConfiguration)
         self.environmentHeight = configuration["environmentHeight"]
         self.environmentWidth = configuration["environmentWidth"]
-        self.configureEnvironment(configuration["environmentMaxSugar"], configuration["environmentMaxSpice"], configuration["environmentSugarPeaks"], configuration["environmentSpicePeaks"])
         self.debug = configuration["debugMode"]
+        self.configureEnvironment(configuration["environmentMaxSugar"], configuration["environmentMaxSpice"], configuration["environmentSugarPeaks"], configuration["environmentSpicePeaks"])
         self.keepAlive = configuration["keepAlivePostExtinction"]
         self.agents = []
+        # Scalar agent state is kept in typed columns when agents are stored as arrays
+        self.agentTable = agent.AgentTable(self.environment, configuration) if configuration["agentStorageMode"] == "arrays" else None
+        self.socialGraph = agent.SocialGraph(configuration["agentAcquaintanceLimit"], configuration["agentAcquaintanceTimeout"])
         self.replacedAgents = []
         self.bornAgents = []
         self.deadAgents = []
         self.diseases = []
         self.agentLeader = None
-        self.activeQuadrants = self.findActiveQuadrants()
+        self.activeQuadrants = [self.environment.addEmptyCellRegion(quadrant) for quadrant in self.findActiveQuadrants()]
         self.configureAgents(configuration["startingAgents"])
         self.configureDiseases(configuration["startingDiseases"])
         self.gui = gui.GUI(self, self.configuration["interfaceHeight"], self.configuration["interfaceWidth"]) if configuration["headlessMode"] == False else None
@@ -91,32 +104,12 @@ class Sugarscape:
         self.agents.append(agent)
 
     def addSpicePeak(self, startX, startY, radius, maxSpice):
-        height = self.environment.height
-        width = self.environment.width
-        radialDispersion = math.sqrt(max(startX, width - startX)**2 + max(startY, height - startY)**2) * (radius / width)
-        for i in range(width):
-            for j in range(height):
-                euclideanDistanceToStart = math.sqrt((startX - i)**2 + (startY - j)**2)
-                currDispersion = 1 + maxSpice * (1 - euclideanDistanceToStart / radialDispersion)
-                cellMaxCapacity = min(currDispersion, maxSpice)
-                cellMaxCapacity = math.ceil(cellMaxCapacity)
-                if cellMaxCapacity > self.environment.findCell(i, j).maxSpice:
-                    self.environment.findCell(i, j).maxSpice = cellMaxCapacity
-                    self.environment.findCell(i, j).spice = cellMaxCapacity
+        peakCapacities = self.findPeakCapacities(startX, startY, radius, maxSpice)
+        self.environment.addSpiceCapacities(peakCapacities)
 
     def addSugarPeak(self, startX, startY, radius, maxSugar):
-        height = self.environment.height
-        width = self.environment.width
-        radialDispersion = math.sqrt(max(startX, width - startX)**2 + max(startY, height - startY)**2) * (radius / width)
-        for i in range(width):
-            for j in range(height):
-                euclideanDistanceToStart = math.sqrt((startX - i)**2 + (startY - j)**2)
-                currDispersion = 1 + maxSugar * (1 - euclideanDistanceToStart / radialDispersion)
-                cellMaxCapacity = min(currDispersion, maxSugar)
-                cellMaxCapacity = math.ceil(cellMaxCapacity)
-                if cellMaxCapacity > self.environment.findCell(i, j).maxSugar:
-                    self.environment.findCell(i, j).maxSugar = cellMaxCapacity
-                    self.environment.findCell(i, j).sugar = cellMaxCapacity
+        peakCapacities = self.findPeakCapacities(startX, startY, radius, maxSugar)
+        self.environment.addSugarCapacities(peakCapacities)
 
     def configureAgents(self, numAgents):
         if self.environment == None:
@@ -125,7 +118,7 @@ class Sugarscape:
         if self.configuration["agentLeader"] == True:
             numAgents += 1
 
-        emptyCells = [[cell for cell in quadrant if cell.agent == None] for quadrant in self.activeQuadrants]
+        emptyCells = [self.environment.emptyRegionCells[quadrant] for quadrant in self.activeQuadrants]
         totalCells = sum(len(quadrant) for quadrant in emptyCells)
         quadrants = len(emptyCells)
         if totalCells == 0:
@@ -137,45 +130,52 @@ class Sugarscape:
 
         # Ensure agent endowments are randomized across initial agent count to make replacements follow same distributions
         agentEndowments = self.randomizeAgentEndowments(numAgents)
-        for quadrant in emptyCells:
-            random.shuffle(quadrant)
+        agentClass = agent.Agent
+        benthamClass = ethics.Bentham
+        leaderClass = ethics.Leader
+        if self.agentTable != None:
+            agentClass = agent.ArrayAgent
+            benthamClass = ethics.ArrayBentham
+            leaderClass = ethics.ArrayLeader
         quadrantIndices = [i for i in range(quadrants)]
         random.shuffle(quadrantIndices)
 
         for i in range(numAgents):
             quadrantIndex = quadrantIndices[i % quadrants]
-            randomCell = emptyCells[quadrantIndex].pop()
+            # Empty cells are sampled directly, as placing an agent removes its cell from the quadrant's empty cells
+            randomCell = emptyCells[quadrantIndex][random.randrange(len(emptyCells[quadrantIndex]))]
             agentConfiguration = agentEndowments[i]
             agentID = self.generateAgentID()
-            a = agent.Agent(agentID, self.timestep, randomCell, agentConfiguration)
+            decisionModel = agentConfiguration["decisionModel"]
+            # Choose the class before constructing so each agent registers, and takes a table row, only once
+            # The leader keeps its place on the grid instead of being replaced by an agent of its ethical decision model
             if self.configuration["agentLeader"] == True and i == numAgents - 1:
-                a = ethics.Leader(agentID, self.timestep, randomCell, agentConfiguration)
+                a = leaderClass(agentID, self.timestep, randomCell, agentConfiguration)
                 self.agentLeader = a
-            # If using a different decision model, replace new agent with instance of child class
-            if "altruist" in agentConfiguration["decisionModel"]:
-                a = ethics.Bentham(agentID, self.timestep, randomCell, agentConfiguration)
+            elif "altruist" in decisionModel:
+                a = benthamClass(agentID, self.timestep, randomCell, agentConfiguration)
                 a.selfishnessFactor = 0
-            elif "bentham" in agentConfiguration["decisionModel"]:
-                a = ethics.Bentham(agentID, self.timestep, randomCell, agentConfiguration)
+            elif "bentham" in decisionModel:
+                a = benthamClass(agentID, self.timestep, randomCell, agentConfiguration)
                 if agentConfiguration["selfishnessFactor"] < 0:
                     a.selfishnessFactor = 0.5
-            elif "egoist" in agentConfiguration["decisionModel"]:
-                a = ethics.Bentham(agentID, self.timestep, randomCell, agentConfiguration)
+            elif "egoist" in decisionModel:
+                a = benthamClass(agentID, self.timestep, randomCell, agentConfiguration)
                 a.selfishnessFactor = 1
-            elif "negativeBentham" in agentConfiguration["decisionModel"]:
-                a = ethics.Bentham(agentID, self.timestep, randomCell, agentConfiguration)
+            elif "negativeBentham" in decisionModel:
+                a = benthamClass(agentID, self.timestep, randomCell, agentConfiguration)
                 a.selfishnessFactor = -1
+            else:
+                a = agentClass(agentID, self.timestep, randomCell, agentConfiguration)
 
-            if "NoLookahead" in agentConfiguration["decisionModel"]:
+            if "NoLookahead" in decisionModel:
                 a.decisionModelLookaheadFactor = 0
-            elif "HalfLookahead" in agentConfiguration["decisionModel"]:
+            elif "HalfLookahead" in decisionModel:
                 a.decisionModelLookaheadFactor = 0.5
             if self.configuration["environmentTribePerQuadrant"] == True:
                 tribe = quadrantIndex
-                tags = self.generateTribeTags(tribe)
-                a.tags = tags
-                a.tribe = a.findTribe()
-            randomCell.agent = a
+                a.setTags(self.generateTribeTags(tribe))
+            randomCell.setAgent(a)
             self.agents.append(a)
             if self.timestep > 0:
                 self.replacedAgents.append(a)
@@ -229,20 +229,41 @@ class Sugarscape:
         width = self.environment.width
         for i in range(width):
             for j in range(height):
-                newCell = cell.Cell(i, j, self.environment)
+                if self.environment.storageMode == "arrays":
+                    newCell = cell.ArrayCell(i, j, self.environment)
+                elif self.environment.regrowthMode == "lazy":
+                    newCell = cell.LazyCell(i, j, self.environment)
+                else:
+                    newCell = cell.ObjectCell(i, j, self.environment)
                 self.environment.setCell(newCell, i, j)
 
-        sugarRadiusScale = 2
-        radius = math.ceil(math.sqrt(sugarRadiusScale * (height + width)))
-        for peak in sugarPeaks:
-            self.addSugarPeak(peak[0], peak[1], radius, maxSugar)
+        cacheFile = None
+        if self.environment.cachePath != None:
+            cacheFile = self.environment.findCacheFile(maxSugar, maxSpice, sugarPeaks, spicePeaks)
+            if self.environment.loadCellCache(cacheFile) == True:
+                return
 
-        spiceRadiusScale = 2
-        radius = math.ceil(math.sqrt(spiceRadiusScale * (height + width)))
-        for peak in spicePeaks:
-            self.addSpicePeak(peak[0], peak[1], radius, maxSpice)
+        sugarMap = self.loadCapacityMap(self.configuration["environmentSugarMap"], maxSugar) if self.configuration["environmentSugarMap"] != None else None
+        if sugarMap is not None:
+            self.environment.addSugarCapacities(sugarMap)
+        else:
+            sugarRadiusScale = 2
+            radius = math.ceil(math.sqrt(sugarRadiusScale * (height + width)))
+            for peak in sugarPeaks:
+                self.addSugarPeak(peak[0], peak[1], radius, maxSugar)
+
+        spiceMap = self.loadCapacityMap(self.configuration["environmentSpiceMap"], maxSpice) if self.configuration["environmentSpiceMap"] != None else None
+        if spiceMap is not None:
+            self.environment.addSpiceCapacities(spiceMap)
+        else:
+            spiceRadiusScale = 2
+            radius = math.ceil(math.sqrt(spiceRadiusScale * (height + width)))
+            for peak in spicePeaks:
+                self.addSpicePeak(peak[0], peak[1], radius, maxSpice)
         self.environment.findCellNeighbors()
         self.environment.findCellRanges()
+        if cacheFile != None:
+            self.environment.saveCellCache(cacheFile)
 
     def doTimestep(self):
         if self.timestep >= self.maxTimestep:
@@ -276,12 +297,8 @@ class Sugarscape:
         if self.log == None:
             return
         # Update total wealth accumulation to include still living agents at simulation end
-        environmentWealthCreated = 0
-        environmentWealthTotal = 0
-        for i in range(self.environment.width):
-            for j in range(self.environment.height):
-                environmentWealthCreated += self.environment.grid[i][j].sugarLastProduced + self.environment.grid[i][j].spiceLastProduced
-                environmentWealthTotal += self.environment.grid[i][j].sugar + self.environment.grid[i][j].spice
+        environmentWealthCreated = self.environment.findWealthCreated()
+        environmentWealthTotal = self.environment.findWealthTotal()
         self.runtimeStats["environmentWealthCreated"] = environmentWealthCreated
         self.runtimeStats["environmentWealthTotal"] = environmentWealthTotal
         logString = '\t' + json.dumps(self.runtimeStats) + "\n]"
@@ -329,6 +346,22 @@ class Sugarscape:
             cellRange.append(quadrantFour)
         return cellRange
 
+    def findPeakCapacities(self, startX, startY, radius, maxCapacity):
+        height = self.environment.height
+        width = self.environment.width
+        radialDispersion = math.sqrt(max(startX, width - startX)**2 + max(startY, height - startY)**2) * (radius / width)
+        if self.environment.storageMode == "arrays":
+            x = numpy.arange(width).reshape(width, 1)
+            y = numpy.arange(height).reshape(1, height)
+            euclideanDistanceToStart = numpy.sqrt((startX - x)**2 + (startY - y)**2)
+            currDispersion = 1 + maxCapacity * (1 - euclideanDistanceToStart / radialDispersion)
+            return numpy.ceil(numpy.minimum(currDispersion, maxCapacity)).astype(numpy.int64)
+        peakCapacities = []
+        for i in range(width):
+            deltaXSquared = (startX - i)**2
+            peakCapacities.append([math.ceil(min(1 + maxCapacity * (1 - math.sqrt(deltaXSquared + (startY - j)**2) / radialDispersion), maxCapacity)) for j in range(height)])
+        return peakCapacities
+
     def generateAgentID(self):
         agentID = self.nextAgentID
         self.nextAgentID += 1
@@ -365,6 +398,91 @@ class Sugarscape:
         random.shuffle(tags)
         return tags
 
+    def loadCapacityMap(self, mapFile, maxCapacity):
+        height = self.environment.height
+        width = self.environment.width
+        if mapFile.endswith(".npy"):
+            try:
+                rows = numpy.load(mapFile)
+            except (OSError, ValueError):
+                rows = None
+            # Only finite numbers can be capacities
+            if isinstance(rows, numpy.ndarray) == False or numpy.issubdtype(rows.dtype, numpy.number) == False or numpy.isfinite(rows).all() == False:
+                if "all" in self.debug or "environment" in self.debug:
+                    print(f"Capacity map {mapFile} is not a finite numeric array. Using environment peaks instead.")
+                return None
+            mapHeight, mapWidth = rows.shape if rows.ndim == 2 else (0, 0)
+        else:
+            graymap = self.loadPortableGraymap(mapFile)
+            if graymap == None:
+                if "all" in self.debug or "environment" in self.debug:
+                    print(f"Capacity map {mapFile} is not a complete P2 or P5 graymap. Using environment peaks instead.")
+                return None
+            rows, maxGray = graymap
+            mapHeight = len(rows)
+            mapWidth = len(rows[0])
+        if mapHeight != height or mapWidth != width:
+            if "all" in self.debug or "environment" in self.debug:
+                print(f"Capacity map {mapFile} is {mapWidth}x{mapHeight} instead of {width}x{height}. Using environment peaks instead.")
+            return None
+        # Map rows run along the y axis, while the environment grid is indexed by x first
+        if mapFile.endswith(".npy"):
+            capacityMap = numpy.clip(numpy.ceil(rows.T), 0, maxCapacity).astype(numpy.int64)
+            return capacityMap if self.environment.storageMode == "arrays" else capacityMap.tolist()
+        # Gray levels are scaled so the brightest possible level is the maximum capacity
+        if self.environment.storageMode == "arrays":
+            return numpy.ceil(numpy.array(rows).T / maxGray * maxCapacity).astype(numpy.int64)
+        return [[math.ceil(rows[j][i] / maxGray * maxCapacity) for j in range(height)] for i in range(width)]
+
+    def loadPortableGraymap(self, mapFile):
+        # Only complete plain (P2) and raw (P5) graymaps are loaded, as anything else cannot be read as a capacity map
+        with open(mapFile, "rb") as file:
+            data = file.read()
+        # Header fields are whitespace-separated and may be interleaved with comments
+        fields = []
+        position = 0
+        while len(fields) < 4:
+            while position < len(data) and data[position:position + 1].isspace():
+                position += 1
+            if position == len(data):
+                return None
+            if data[position:position + 1] == b"#":
+                position = data.find(b"\n", position)
+                if position == -1:
+                    return None
+                continue
+            start = position
+            while position < len(data) and not data[position:position + 1].isspace():
+                position += 1
+            fields.append(data[start:position])
+        if fields[0] not in [b"P2", b"P5"] or not all(field.isdigit() for field in fields[1:]):
+            return None
+        magicNumber, width, height, maxGray = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+        if width == 0 or height == 0 or maxGray == 0 or maxGray > 65535:
+            return None
+        if magicNumber == b"P5":
+            # A single whitespace character separates the header from the binary raster
+            raster = data[position + 1:]
+            if maxGray < 256:
+                if len(raster) != width * height:
+                    return None
+                values = list(raster)
+            else:
+                if len(raster) != width * height * 2:
+                    return None
+                # Two-byte samples are stored most significant byte first
+                values = array.array('H', raster)
+                if sys.byteorder == "little":
+                    values.byteswap()
+                values = values.tolist()
+        else:
+            values = data[position:].split()
+            if len(values) != width * height or not all(value.isdigit() for value in values):
+                return None
+            values = [int(value) for value in values]
+        rows = [values[row * width:(row + 1) * width] for row in range(height)]
+        return rows, maxGray
+
     def pauseSimulation(self):
         while self.run == False:
             if self.gui != None and self.end == False:
@@ -825,7 +943,11 @@ class Sugarscape:
     def updateGiniCoefficient(self):
         if len(self.agents) == 0:
             return 0
-        agentWealths = sorted([agent.sugar + agent.spice for agent in self.agents])
+        # The leader's wealth is only exact on the agent itself, so the wealth columns are read without one
+        if self.agentTable != None and self.agentLeader == None:
+            agentWealths = sorted((self.agentTable.findColumn("sugar", self.agents) + self.agentTable.findColumn("spice", self.agents)).tolist())
+        else:
+            agentWealths = sorted([agent.sugar + agent.spice for agent in self.agents])
         # Calculate normalized area of Lorenz curve of agent wealths
         numAgents = len(agentWealths)
         totalWealth = sum(agentWealths)
@@ -859,13 +981,20 @@ class Sugarscape:
         maxSpice = 0
         maxSugar = 0
         maxWealth = 0
-        for agent in self.agents:
-            if agent.spice > maxSpice:
-                maxSpice = agent.spice
-            if agent.sugar > maxSugar:
-                maxSugar = agent.sugar
-            if agent.sugar + agent.spice > maxWealth:
-                maxWealth = agent.sugar + agent.spice
+        if self.agentTable != None and self.agentLeader == None and len(self.agents) > 0:
+            agentSpice = self.agentTable.findColumn("spice", self.agents)
+            agentSugar = self.agentTable.findColumn("sugar", self.agents)
+            maxSpice = max(0, agentSpice.max().item())
+            maxSugar = max(0, agentSugar.max().item())
+            maxWealth = max(0, (agentSugar + agentSpice).max().item())
+        else:
+            for agent in self.agents:
+                if agent.spice > maxSpice:
+                    maxSpice = agent.spice
+                if agent.sugar > maxSugar:
+                    maxSugar = agent.sugar
+                if agent.sugar + agent.spice > maxWealth:
+                    maxWealth = agent.sugar + agent.spice
         self.graphStats["maxSpice"] = maxSpice
         self.graphStats["maxSugar"] = maxSugar
         self.graphStats["maxWealth"] = maxWealth
@@ -943,14 +1072,10 @@ class Sugarscape:
         if self.timestep == 0:
             carryingCapacity = len(self.agents)
 
-        environmentWealthCreated = 0
-        environmentWealthTotal = 0
-        for i in range(self.environment.width):
-            for j in range(self.environment.height):
-                environmentWealthCreated += self.environment.grid[i][j].sugarLastProduced + self.environment.grid[i][j].spiceLastProduced
-                environmentWealthTotal += self.environment.grid[i][j].sugar + self.environment.grid[i][j].spice
-                if self.timestep == 1:
-                    environmentWealthCreated += self.environment.grid[i][j].maxSugar + self.environment.grid[i][j].maxSpice
+        environmentWealthCreated = self.environment.findWealthCreated()
+        environmentWealthTotal = self.environment.findWealthTotal()
+        if self.timestep == 1:
+            environmentWealthCreated += self.environment.findWealthCapacity()
 
         agentAgingDeaths = 0
         agentCombatDeaths = 0
@@ -1100,6 +1225,10 @@ class Sugarscape:
             self.runtimeStats["timestep"] = self.timestep
             self.bornAgents = []
             self.replacedAgents = []
+            # Table rows of dead agents are reused once their stats have been gathered
+            if self.agentTable != None:
+                for agent in self.deadAgents:
+                    agent.removeRow()
             self.deadAgents = []
         else:
             # Convert keys to Pythonic case scheme
@@ -1187,7 +1316,7 @@ def verifyConfiguration(configuration):
             if len(configValue) == 0:
                 continue
             configType = type(configValue[0])
-            if configName != "environmentPollutionDiffusionTimeFrame" and configName != "environmentPollutionTimeFrame":
+            if configName != "environmentPollutionDiffusionTimeFrame" and configName != "environmentPollutionTimeFrame" and configName != "environmentPollutionDiffusionKernel":
                 configValue.sort()
             if configName not in negativesAllowed and (configType == int or configType == float):
                 for i in range(len(configValue)):
@@ -1211,6 +1340,47 @@ def verifyConfiguration(configuration):
     if len(configuration["environmentStartingQuadrants"]) == 0:
         configuration["environmentStartingQuadrants"] = [1, 2, 3, 4]
 
+    if configuration["environmentCachePath"] == "":
+        configuration["environmentCachePath"] = None
+
+    for mapOption in ["environmentSpiceMap", "environmentSugarMap"]:
+        mapFile = configuration[mapOption]
+        if mapFile == "":
+            configuration[mapOption] = None
+        elif mapFile != None and (os.path.isfile(mapFile) == False or os.path.splitext(mapFile)[1] not in [".npy", ".pgm"]):
+            if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+                print(f"Cannot load capacity map {mapFile}. Using environment peaks instead.")
+            configuration[mapOption] = None
+        elif mapFile != None and mapFile.endswith(".npy") and numpy == None:
+            if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+                print(f"Loading capacity map {mapFile} requires NumPy. Using environment peaks instead.")
+            configuration[mapOption] = None
+
+    if configuration["agentStorageMode"] not in ["arrays", "objects"]:
+        if "all" in configuration["debugMode"] or "agent" in configuration["debugMode"]:
+            print(f"Agent storage mode {configuration['agentStorageMode']} not recognized. Setting agent storage mode to objects.")
+        configuration["agentStorageMode"] = "objects"
+    elif configuration["agentStorageMode"] == "arrays" and numpy == None:
+        print("Array agent storage requires NumPy. Setting agent storage mode to objects.")
+        configuration["agentStorageMode"] = "objects"
+
+    if configuration["environmentStorageMode"] not in ["arrays", "objects"]:
+        if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+            print(f"Environment storage mode {configuration['environmentStorageMode']} not recognized. Setting environment storage mode to objects.")
+        configuration["environmentStorageMode"] = "objects"
+    elif configuration["environmentStorageMode"] == "arrays" and numpy == None:
+        print("Array environment storage requires NumPy. Setting environment storage mode to objects.")
+        configuration["environmentStorageMode"] = "objects"
+
+    if configuration["environmentRegrowthMode"] not in ["eager", "lazy"]:
+        if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+            print(f"Environment regrowth mode {configuration['environmentRegrowthMode']} not recognized. Setting environment regrowth mode to eager.")
+        configuration["environmentRegrowthMode"] = "eager"
+    elif configuration["environmentRegrowthMode"] == "lazy" and configuration["environmentStorageMode"] == "arrays":
+        if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+            print("Cannot use lazy environment regrowth with array environment storage. Setting environment regrowth mode to eager.")
+        configuration["environmentRegrowthMode"] = "eager"
+
     if configuration["environmentTribePerQuadrant"] == True:
         configuration["environmentMaxTribes"] = len(configuration["environmentStartingQuadrants"])
 
@@ -1328,6 +1498,14 @@ def verifyConfiguration(configuration):
             pollutionDiffusionEnd = configuration["timesteps"]
         configuration["environmentPollutionDiffusionTimeframe"] = [pollutionDiffusionStart, pollutionDiffusionEnd]
 
+    # Ensure a custom pollution diffusion kernel is a rectangular grid of weights with a center cell
+    kernel = configuration["environmentPollutionDiffusionKernel"]
+    if kernel != None:
+        if len(kernel) == 0 or len(kernel) % 2 == 0 or len(kernel[0]) % 2 == 0 or any(len(row) != len(kernel[0]) for row in kernel):
+            if "all" in configuration["debugMode"] or "environment" in configuration["debugMode"]:
+                print(f"Cannot use pollution diffusion kernel {kernel}. Diffusing pollution evenly across the cell neighborhood.")
+            configuration["environmentPollutionDiffusionKernel"] = None
+
     # Ensure the pollution start and end timesteps are in the proper order
     if configuration["environmentPollutionTimeframe"] != [0, 0]:
         pollutionStart, pollutionEnd = configuration["environmentPollutionTimeframe"]
@@ -1383,7 +1561,9 @@ def verifyConfiguration(configuration):
 
 if __name__ == "__main__":
     # Set default values for simulation configuration
-    configuration = {"agentAggressionFactor": [0, 0],
+    configuration = {"agentAcquaintanceLimit": 16,
+                     "agentAcquaintanceTimeout": 100,
+                     "agentAggressionFactor": [0, 0],
                      "agentBaseInterestRate": [0.0, 0.0],
                      "agentDecisionModels": ["none"],
                      "agentDecisionModel": None,
@@ -1413,6 +1593,7 @@ if __name__ == "__main__":
                      "agentSpiceMetabolism": [0, 0],
                      "agentStartingSpice": [0, 0],
                      "agentStartingSugar": [10, 40],
+                     "agentStorageMode": "objects",
                      "agentSugarMetabolism": [1, 4],
                      "agentTagging": False,
                      "agentTagPreferences": False,
@@ -1430,6 +1611,7 @@ if __name__ == "__main__":
                      "diseaseSugarMetabolismPenalty": [0, 0],
                      "diseaseTagStringLength": [0, 0],
                      "diseaseVisionPenalty": [0, 0],
+                     "environmentCachePath": None,
                      "environmentEquator": -1,
                      "environmentHeight": 50,
                      "environmentMaxCombatLoot": 0,
@@ -1437,17 +1619,22 @@ if __name__ == "__main__":
                      "environmentMaxSugar": 4,
                      "environmentMaxTribes": 0,
                      "environmentPollutionDiffusionDelay": 0,
+                     "environmentPollutionDiffusionKernel": None,
                      "environmentPollutionDiffusionTimeframe": [0, 0],
                      "environmentPollutionTimeframe": [0, 0],
                      "environmentQuadrantSizeFactor": 1,
+                     "environmentRegrowthMode": "eager",
                      "environmentSeasonalGrowbackDelay": 0,
                      "environmentSeasonInterval": 0,
                      "environmentSpiceConsumptionPollutionFactor": 0,
+                     "environmentSpiceMap": None,
                      "environmentSpicePeaks": [[35, 35], [15, 15]],
                      "environmentSpiceProductionPollutionFactor": 0,
                      "environmentSpiceRegrowRate": 0,
                      "environmentStartingQuadrants": [1, 2, 3, 4],
+                     "environmentStorageMode": "objects",
                      "environmentSugarConsumptionPollutionFactor": 0,
+                     "environmentSugarMap": None,
                      "environmentSugarPeaks": [[35, 15], [15, 35]],
                      "environmentSugarProductionPollutionFactor": 0,
                      "environmentSugarRegrowRate": 1,
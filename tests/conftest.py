@@ -0,0 +1,24 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+repositoryPath = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repositoryPath)
+
+import sugarscape
+
+@pytest.fixture
+def makeSugarscape(monkeypatch):
+    monkeypatch.chdir(repositoryPath)
+    def makeSugarscape(**options):
+        configuration = json.load(open(os.path.join(repositoryPath, "config.json")))["sugarscapeOptions"]
+        configuration.pop("__README__", None)
+        configuration.update({"agentDecisionModel": None, "headlessMode": True, "logfile": None, "seed": 0})
+        configuration.update(options)
+        configuration = sugarscape.verifyConfiguration(configuration)
+        random.seed(configuration["seed"])
+        return sugarscape.Sugarscape(configuration)
+    return makeSugarscape
@@ -0,0 +1,169 @@
+import json
+import random
+
+import pytest
+
+import agent
+
+def test_agentsTakeOneTableRowEach(makeSugarscape):
+    pytest.importorskip("numpy")
+    sugarscape = makeSugarscape(agentDecisionModels=["bentham", "altruistic", "egoistic", "negativeBentham", "none"], agentLeader=True,
+                                agentStorageMode="arrays", startingAgents=100)
+    assert sugarscape.agentTable.rows == len(sugarscape.agents)
+    assert sugarscape.agentLeader in sugarscape.agents
+
+def test_deadAgentRowsAreReused(makeSugarscape):
+    pytest.importorskip("numpy")
+    sugarscape = makeSugarscape(agentMaxAge=[10, 20], agentReplacements=100, agentStorageMode="arrays", startingAgents=100, timesteps=60)
+    for timestep in range(60):
+        sugarscape.doTimestep()
+    assert sugarscape.nextAgentID > 2 * sugarscape.agentTable.rows
+    livingRows = [agent.row for agent in sugarscape.agents]
+    assert len(set(livingRows)) == len(livingRows)
+
+def test_removedAgentsKeepTheirState(makeSugarscape):
+    pytest.importorskip("numpy")
+    sugarscape = makeSugarscape(agentMaxAge=[5, 5], agentStorageMode="arrays", startingAgents=20, timesteps=10)
+    agents = list(sugarscape.agents)
+    for timestep in range(7):
+        sugarscape.doTimestep()
+    deadAgents = [agent for agent in agents if agent not in sugarscape.agents]
+    assert len(deadAgents) > 0
+    finalStates = [(agent.age, agent.sugar, agent.spice, agent.causeOfDeath) for agent in deadAgents]
+    sugarscape.configureAgents(len(deadAgents))
+    # New agents reuse the freed rows without overwriting what the dead agents last held
+    assert sugarscape.agentTable.rows == len(agents)
+    assert [(agent.age, agent.sugar, agent.spice, agent.causeOfDeath) for agent in deadAgents] == finalStates
+    assert all(agent.isAlive() == False for agent in deadAgents)
+
+def findLogLines(sugarscape, timesteps):
+    sugarscape.updateRuntimeStats()
+    logLines = [json.dumps(sugarscape.runtimeStats)]
+    for timestep in range(timesteps):
+        sugarscape.doTimestep()
+        logLines.append(json.dumps(sugarscape.runtimeStats))
+    return logLines
+
+@pytest.mark.parametrize("options", [{"agentDecisionModels": ["bentham", "egoistic", "none"]},
+                                     {"agentLeader": True, "agentDecisionModels": ["none"]}])
+def test_arrayAgentLogsMatchObjectAgentLogs(makeSugarscape, options):
+    pytest.importorskip("numpy")
+    objectLog = findLogLines(makeSugarscape(agentStorageMode="objects", seed=12345, startingAgents=100, **options), 15)
+    arrayLog = findLogLines(makeSugarscape(agentStorageMode="arrays", seed=12345, startingAgents=100, **options), 15)
+    assert arrayLog == objectLog
+
+@pytest.mark.parametrize("storageMode", ["objects", "arrays"])
+def test_agentsHaveNoAttributeDictionary(makeSugarscape, storageMode):
+    if storageMode == "arrays":
+        pytest.importorskip("numpy")
+    sugarscape = makeSugarscape(agentDecisionModels=["bentham", "none"], agentStorageMode=storageMode, startingAgents=10)
+    assert len({type(agent) for agent in sugarscape.agents}) == 2
+    assert all(hasattr(agent, "__dict__") == False for agent in sugarscape.agents)
+
+def test_deadCreditorIsRemovedOnceRepaidThroughChildren(makeSugarscape):
+    sugarscape = makeSugarscape(agentInheritancePolicy="children", startingAgents=3)
+    socialGraph = sugarscape.socialGraph
+    creditor, debtor, child = sugarscape.agents[:3]
+    creditor.socialNetwork["children"].append(child.ID)
+    creditor.addLoanToAgent(debtor, debtor.lastMoved, 0, 10, 0, 10, 1)
+    creditor.doDeath("aging")
+    # The living debtor still needs the creditor's children and inheritance policy
+    assert socialGraph.findAgent(creditor.ID) == creditor
+    debtor.payDebt(debtor.socialNetwork["creditors"][0])
+    assert creditor.ID not in socialGraph.agents
+    assert socialGraph.findAgent(creditor.ID).isAlive() == False
+    assert [loan["creditor"] for loan in debtor.socialNetwork["creditors"]] == [child.ID]
+
+def test_deadCreditorIsKeptForDebtorsShortOfResources(makeSugarscape):
+    sugarscape = makeSugarscape(startingAgents=2)
+    creditor, debtor = sugarscape.agents[:2]
+    creditor.addLoanToAgent(debtor, debtor.lastMoved, 0, 10, 0, 10, 1)
+    debtor.sugar = -1
+    creditor.doDeath("aging")
+    # The debtor is not yet marked dead, so it may still repay the creditor
+    assert debtor.isAlive() == False
+    assert sugarscape.socialGraph.findAgent(creditor.ID) == creditor
+
+def test_debtToRemovedCreditorIsDropped(makeSugarscape):
+    sugarscape = makeSugarscape(agentInheritancePolicy="children", startingAgents=2)
+    socialGraph = sugarscape.socialGraph
+    creditor, debtor = sugarscape.agents[:2]
+    creditor.addLoanToAgent(debtor, debtor.lastMoved, 0, 10, 0, 10, 1)
+    creditor.doDeath("aging")
+    creditor.socialNetwork["debtors"] = []
+    socialGraph.removeAgent(creditor)
+    assert creditor.ID not in socialGraph.agents
+    debtor.payDebt(debtor.socialNetwork["creditors"][0])
+    assert debtor.socialNetwork["creditors"] == []
+
+def test_staleEdgesAreRemoved(makeSugarscape):
+    sugarscape = makeSugarscape(agentAcquaintanceLimit=8, agentAcquaintanceTimeout=30, startingAgents=40)
+    socialGraph = sugarscape.socialGraph
+    assert (socialGraph.minEdgeLimit, socialGraph.maxEdgeAge) == (8, 30)
+    agent, deadAcquaintance, recentAcquaintance = sugarscape.agents[:3]
+    for other in sugarscape.agents[1:9]:
+        socialGraph.addEdge(agent.ID, other.ID, 0)
+    socialGraph.findEdge(agent.ID, deadAcquaintance.ID).lastSeen = 180
+    socialGraph.findEdge(agent.ID, recentAcquaintance.ID).lastSeen = 180
+    deadAcquaintance.doDeath("aging")
+    assert deadAcquaintance.ID not in socialGraph.agents
+    socialGraph.addEdge(agent.ID, sugarscape.agents[-1].ID, 200)
+    # Only living acquaintances seen within the last agentAcquaintanceTimeout timesteps are kept
+    assert set(socialGraph.findEdges(agent.ID)) == {recentAcquaintance.ID, sugarscape.agents[-1].ID}
+
+def findFreshMismatches(agent, diseaseRecord):
+    startIndex = diseaseRecord["startIndex"]
+    immuneSystem = agent.immuneSystem
+    # Disease tags past the end of the immune system always mismatch
+    return sum(1 << i for i, tag in enumerate(diseaseRecord["disease"].tags) if startIndex + i >= len(immuneSystem) or immuneSystem[startIndex + i] != tag)
+
+def test_immuneResponseMismatchesMatchRecount(makeSugarscape, monkeypatch):
+    updateImmuneSystem = agent.Agent.updateImmuneSystem
+    updates = []
+    def checkedUpdateImmuneSystem(self, position, bit):
+        updateImmuneSystem(self, position, bit)
+        updates.append(position)
+        for diseaseRecord in self.diseases:
+            freshMismatches = findFreshMismatches(self, diseaseRecord)
+            assert diseaseRecord["mismatches"].bit_count() == freshMismatches.bit_count()
+            assert diseaseRecord["mismatches"] == freshMismatches
+    monkeypatch.setattr(agent.Agent, "updateImmuneSystem", checkedUpdateImmuneSystem)
+    sugarscape = makeSugarscape(agentImmuneSystemLength=25, diseaseTagStringLength=[5, 20], startingAgents=200, startingDiseases=20,
+                                startingDiseasesPerAgent=[1, 3], timesteps=30)
+    for timestep in range(30):
+        sugarscape.doTimestep()
+    assert len(updates) > 0
+
+bestCellScenarios = {"radial": {"agentMovementMode": "radial", "agentVisionMode": "radial"},
+                     "bounded": {"environmentWraparound": False},
+                     "combat": {"agentAggressionFactor": [0, 1]},
+                     "pollution": {"environmentPollutionDiffusionDelay": 2, "environmentPollutionDiffusionTimeframe": [0, 30], "environmentPollutionTimeframe": [0, 30],
+                                   "environmentSpiceConsumptionPollutionFactor": 1, "environmentSugarProductionPollutionFactor": 1}}
+
+@pytest.mark.parametrize("scenario", bestCellScenarios)
+def test_bestCellInRangeMatchesExhaustiveSearch(makeSugarscape, scenario):
+    sugarscape = makeSugarscape(agentDecisionModels=["none"], startingAgents=300, timesteps=10, **bestCellScenarios[scenario])
+    for timestep in range(5):
+        sugarscape.doTimestep()
+    for agent in sugarscape.agents:
+        # Both searches draw the same shuffle from the restored random state, so ties are broken alike
+        randomState = random.getstate()
+        bestCell = agent.findBestCellInRange()
+        random.setstate(randomState)
+        assert bestCell == agent.findTopCellsByWealth(agent.findPotentialCells(), 1)[0][0]
+
+@pytest.mark.parametrize("storageMode", ["objects", "arrays"])
+def test_memoizedTimeToLiveFollowsItsInputs(makeSugarscape, storageMode):
+    if storageMode == "arrays":
+        pytest.importorskip("numpy")
+    sugarscape = makeSugarscape(agentStorageMode=storageMode, environmentUniversalSpiceIncomeInterval=3, environmentUniversalSugarIncomeInterval=2, startingAgents=10)
+    agent = sugarscape.agents[0]
+    changes = [("sugar", 7), ("spice", 3.5), ("sugarMetabolismModifier", 2), ("spiceMetabolismModifier", -1), ("sugarMetabolism", 3), ("spiceMetabolism", 1),
+               ("universalSugar", 2), ("universalSpice", 1), ("age", agent.maxAge - 2)]
+    for attribute, value in changes:
+        # Find the memoized value first, so the change has to replace it
+        agent.findTimeToLive()
+        setattr(agent, attribute, value)
+        timeToLive = agent.findUnlimitedTimeToLive()
+        assert agent.findTimeToLive() == timeToLive
+        assert agent.findTimeToLive(True) == min(timeToLive, agent.maxAge - agent.age)
@@ -0,0 +1,42 @@
+import inspect
+import json
+import types
+
+import pytest
+
+def findShadowedSlots(instance):
+    # Slots hidden behind a property of a subclass still take space in every instance
+    slots = [slot for cls in type(instance).__mro__ for slot in getattr(cls, "__slots__", ())]
+    return [slot for slot in slots if isinstance(inspect.getattr_static(instance, slot), types.MemberDescriptorType) == False]
+
+@pytest.mark.parametrize("storageMode, regrowthMode", [("objects", "eager"), ("objects", "lazy"), ("arrays", "eager")])
+def test_cellsHaveOnlyTheirOwnSlots(makeSugarscape, storageMode, regrowthMode):
+    if storageMode == "arrays":
+        pytest.importorskip("numpy")
+    environment = makeSugarscape(environmentRegrowthMode=regrowthMode, environmentStorageMode=storageMode, startingAgents=0).environment
+    cell = environment.findCell(0, 0)
+    assert hasattr(cell, "__dict__") == False
+    assert findShadowedSlots(cell) == []
+
+def findRunState(sugarscape, timesteps):
+    runtimeStats = []
+    for timestep in range(timesteps):
+        sugarscape.doTimestep()
+        runtimeStats.append(json.dumps(sugarscape.runtimeStats))
+    # Cells are only read once the run is over, so lazy cells catch up across every timestep they were left untouched
+    cellStates = [(cell.sugar, cell.spice, cell.pollution, cell.season) for cell in sugarscape.environment.cells]
+    return runtimeStats, cellStates
+
+regrowthScenarios = {"seasons": {"environmentSeasonalGrowbackDelay": 3, "environmentSeasonInterval": 7, "environmentSpiceRegrowRate": 0.5, "environmentSugarRegrowRate": 0.25},
+                     "pollution": {"environmentPollutionDiffusionDelay": 2, "environmentPollutionDiffusionTimeframe": [0, 30], "environmentPollutionTimeframe": [0, 30],
+                                   "environmentSpiceConsumptionPollutionFactor": 1, "environmentSugarProductionPollutionFactor": 1},
+                     "disease": {"startingDiseases": 20, "startingDiseasesPerAgent": [1, 3]},
+                     "combat": {"agentAggressionFactor": [0, 1], "agentDecisionModels": ["none"], "environmentSeasonInterval": 5}}
+
+@pytest.mark.parametrize("regrowthMode", ["eager", "lazy"])
+@pytest.mark.parametrize("scenario", regrowthScenarios)
+def test_regrowthMatchesEagerRegrowth(makeSugarscape, regrowthMode, scenario):
+    options = dict(regrowthScenarios[scenario], startingAgents=200, timesteps=30)
+    # Eager regrowth is compared against a second run of itself, so both runs are known to be repeatable
+    expectedState = findRunState(makeSugarscape(environmentRegrowthMode="eager", **options), 30)
+    assert findRunState(makeSugarscape(environmentRegrowthMode=regrowthMode, **options), 30) == expectedState
@@ -0,0 +1,180 @@
+import math
+
+import pytest
+
+import agent
+
+def findNeighborCoordinates(cell):
+    return {(neighbor.x, neighbor.y) for neighbor in cell.findNeighborCells()}
+
+def test_boundedNeighborsStayOnGrid(makeSugarscape):
+    environment = makeSugarscape(environmentHeight=5, environmentWidth=6, environmentWraparound=False, startingAgents=0).environment
+    for x in range(environment.width):
+        for y in range(environment.height):
+            expected = {(x + deltaX, y + deltaY) for deltaX, deltaY in [(0, 1), (1, 0), (0, -1), (-1, 0)]
+                        if 0 <= x + deltaX < environment.width and 0 <= y + deltaY < environment.height}
+            assert findNeighborCoordinates(environment.findCell(x, y)) == expected
+
+def test_southNeighborOnBoundedGrid(makeSugarscape):
+    environment = makeSugarscape(environmentHeight=5, environmentWidth=5, environmentWraparound=False, startingAgents=0).environment
+    # The bottom row has no south neighbor instead of wrapping to the top row
+    assert (2, 0) not in findNeighborCoordinates(environment.findCell(2, 4))
+    assert (2, 3) in findNeighborCoordinates(environment.findCell(2, 2))
+
+def test_wraparoundNeighbors(makeSugarscape):
+    environment = makeSugarscape(environmentHeight=5, environmentWidth=6, environmentWraparound=True, startingAgents=0).environment
+    assert findNeighborCoordinates(environment.findCell(0, 4)) == {(0, 0), (1, 4), (0, 3), (5, 4)}
+
+def findRangeCoordinates(environment, x, y, cellRange):
+    return {(cell.x, cell.y): distance for cell, distance in environment.findCellsInRange(x, y, cellRange).items()}
+
+def test_boundedCardinalRangesStayOnGrid(makeSugarscape):
+    environment = makeSugarscape(environmentHeight=8, environmentWidth=8, environmentWraparound=False, agentMovementMode="cardinal",
+                                 agentVisionMode="cardinal", startingAgents=0).environment
+    # Cardinal ranges on bounded grids no longer reach around the edges to the far side
+    assert findRangeCoordinates(environment, 0, 0, 3) == {(1, 0): 1, (2, 0): 2, (3, 0): 3, (0, 1): 1, (0, 2): 2, (0, 3): 3}
+
+def test_wraparoundCardinalRanges(makeSugarscape):
+    environment = makeSugarscape(environmentHeight=8, environmentWidth=8, environmentWraparound=True, agentMovementMode="cardinal",
+                                 agentVisionMode="cardinal", startingAgents=0).environment
+    cellsInRange = findRangeCoordinates(environment, 0, 0, 2)
+    assert cellsInRange == {(1, 0): 1, (2, 0): 2, (7, 0): 1, (6, 0): 2, (0, 1): 1, (0, 2): 2, (0, 7): 1, (0, 6): 2}
+
+def test_arrayCellCacheWithFractionalRegrowth(makeSugarscape, tmp_path):
+    pytest.importorskip("numpy")
+    options = {"environmentCachePath": str(tmp_path), "environmentSpiceRegrowRate": 0.5, "environmentStorageMode": "arrays",
+               "environmentSugarRegrowRate": 0.5, "startingAgents": 10}
+    savedEnvironment = makeSugarscape(**options).environment
+    assert len(list(tmp_path.glob("*.cache"))) == 1
+    loadedEnvironment = makeSugarscape(**options).environment
+    assert loadedEnvironment.cellMaxSugar.dtype == savedEnvironment.cellMaxSugar.dtype
+    assert (loadedEnvironment.cellMaxSugar == savedEnvironment.cellMaxSugar).all()
+    assert (loadedEnvironment.cellMaxSpice == savedEnvironment.cellMaxSpice).all()
+
+def test_objectCellCacheKeepsIntegerCapacities(makeSugarscape, tmp_path):
+    options = {"environmentCachePath": str(tmp_path), "environmentStorageMode": "objects", "startingAgents": 10}
+    savedCells = makeSugarscape(**options).environment.cells
+    loadedCells = makeSugarscape(**options).environment.cells
+    assert [(cell.maxSugar, cell.maxSpice) for cell in loadedCells] == [(cell.maxSugar, cell.maxSpice) for cell in savedCells]
+    assert all(type(cell.maxSugar) == int and type(cell.maxSpice) == int for cell in loadedCells)
+
+def findSugarCapacities(environment):
+    return [[environment.findCell(x, y).maxSugar for y in range(environment.height)] for x in range(environment.width)]
+
+def writeGraymap(mapFile, header, raster):
+    mapFile.write_bytes(header.encode() + raster)
+    return str(mapFile)
+
+# Map rows run along the y axis, so the gray level in row y and column x is the capacity of cell (x, y)
+grayLevels = [[0, 1, 2, 3, 4], [5, 6, 7, 8, 9], [10, 11, 12, 13, 14], [15, 16, 17, 18, 19]]
+
+@pytest.mark.parametrize("storageMode", ["objects", "arrays"])
+def test_npyCapacityMapIsTransposedAndClamped(makeSugarscape, tmp_path, storageMode):
+    numpy = pytest.importorskip("numpy")
+    mapFile = str(tmp_path / "sugar.npy")
+    numpy.save(mapFile, (numpy.array(grayLevels) - 3) / 2)
+    environment = makeSugarscape(environmentHeight=4, environmentMaxSugar=6, environmentWidth=5, environmentStorageMode=storageMode,
+                                 environmentSugarMap=mapFile, startingAgents=0).environment
+    # Capacities below zero or above the maximum are clamped
+    assert findSugarCapacities(environment) == [[min(6, max(0, math.ceil((grayLevels[y][x] - 3) / 2))) for y in range(4)] for x in range(5)]
+
+@pytest.mark.parametrize("mapContents", ["garbage", "pickled", "nan", "infinite", "strings"])
+def test_malformedNpyFallsBackToPeaks(makeSugarscape, tmp_path, capsys, mapContents):
+    numpy = pytest.importorskip("numpy")
+    mapFile = str(tmp_path / "sugar.npy")
+    if mapContents == "garbage":
+        open(mapFile, "wb").write(b"not an array" * 10)
+    else:
+        rows = numpy.ones((4, 5))
+        if mapContents == "pickled":
+            rows = rows.astype(object)
+        elif mapContents == "nan":
+            rows[1, 2] = numpy.nan
+        elif mapContents == "infinite":
+            rows[1, 2] = numpy.inf
+        elif mapContents == "strings":
+            rows = rows.astype(str)
+        numpy.save(mapFile, rows)
+    peakCapacities = findSugarCapacities(makeSugarscape(environmentHeight=4, environmentWidth=5, startingAgents=0).environment)
+    environment = makeSugarscape(debugMode=["environment"], environmentHeight=4, environmentWidth=5, environmentSugarMap=mapFile,
+                                 startingAgents=0).environment
+    assert findSugarCapacities(environment) == peakCapacities
+    assert "not a finite numeric array" in capsys.readouterr().out
+
+@pytest.mark.parametrize("storageMode", ["objects", "arrays"])
+@pytest.mark.parametrize("magicNumber, maxGray", [("P2", 19), ("P5", 19), ("P5", 1900)])
+def test_graymapCapacityMapIsScaled(makeSugarscape, tmp_path, storageMode, magicNumber, maxGray):
+    if storageMode == "arrays":
+        pytest.importorskip("numpy")
+    values = [level * (maxGray // 19) for row in grayLevels for level in row]
+    if magicNumber == "P2":
+        raster = " ".join(str(value) for value in values).encode()
+    else:
+        raster = b"".join(value.to_bytes(1 if maxGray < 256 else 2, "big") for value in values)
+    mapFile = writeGraymap(tmp_path / "sugar.pgm", f"{magicNumber}\n# Comment\n5 4\n{maxGray}\n", raster)
+    environment = makeSugarscape(environmentHeight=4, environmentMaxSugar=4, environmentWidth=5, environmentStorageMode=storageMode,
+                                 environmentSugarMap=mapFile, startingAgents=0).environment
+    # The brightest possible gray level is the maximum capacity
+    assert findSugarCapacities(environment) == [[math.ceil(grayLevels[y][x] / 19 * 4) for y in range(4)] for x in range(5)]
+
+@pytest.mark.parametrize("header, raster", [("P2\n5 4\n", b""), ("P2\n5", b""), ("P5\n5 4\n19\n", b"\x13" * 19), ("P5\n5 4\n19\n", b"\x13" * 21),
+                                            ("P2\n5 4\n19\n", b"19 " * 19), ("P3\n5 4\n19\n", b"19 " * 60), ("P5\n5 4\n19", b"")],
+                         ids=["missingMaxGray", "truncatedHeader", "shortRaw", "longRaw", "shortPlain", "colorMagicNumber", "missingRaster"])
+def test_malformedGraymapFallsBackToPeaks(makeSugarscape, tmp_path, header, raster):
+    mapFile = writeGraymap(tmp_path / "sugar.pgm", header, raster)
+    peakCapacities = findSugarCapacities(makeSugarscape(environmentHeight=4, environmentWidth=5, startingAgents=0).environment)
+    environment = makeSugarscape(environmentHeight=4, environmentWidth=5, environmentSugarMap=mapFile, startingAgents=0).environment
+    assert findSugarCapacities(environment) == peakCapacities
+
+def test_misshapenCapacityMapFallsBackToPeaks(makeSugarscape, tmp_path, capsys):
+    mapFile = writeGraymap(tmp_path / "sugar.pgm", "P5\n4 5\n19\n", b"\x13" * 20)
+    peakCapacities = findSugarCapacities(makeSugarscape(environmentHeight=4, environmentWidth=5, startingAgents=0).environment)
+    environment = makeSugarscape(environmentHeight=4, environmentWidth=5, environmentSugarMap=mapFile, startingAgents=0).environment
+    assert findSugarCapacities(environment) == peakCapacities
+    assert capsys.readouterr().out == ""
+    makeSugarscape(debugMode=["environment"], environmentHeight=4, environmentWidth=5, environmentSugarMap=mapFile, startingAgents=0)
+    assert "instead of 5x4" in capsys.readouterr().out
+
+def findFreshNeighborWealth(cell):
+    return sum(neighbor.sugar + neighbor.spice for neighbor in cell.findNeighborCells())
+
+@pytest.mark.parametrize("storageMode, regrowthMode", [("objects", "eager"), ("objects", "lazy"), ("arrays", "eager")])
+def test_neighborWealthMatchesRecount(makeSugarscape, monkeypatch, storageMode, regrowthMode):
+    if storageMode == "arrays":
+        pytest.importorskip("numpy")
+    collectResourcesAtCell = agent.Agent.collectResourcesAtCell
+    def checkedCollectResourcesAtCell(self):
+        collectResourcesAtCell(self)
+        # Neighbor wealth already found this timestep must follow the harvest
+        environment = self.cell.environment
+        for neighbor in self.cell.findNeighborCells():
+            if environment.neighborWealth != None and environment.neighborWealth[neighbor.index] != None:
+                assert environment.neighborWealth[neighbor.index] == findFreshNeighborWealth(neighbor)
+    monkeypatch.setattr(agent.Agent, "collectResourcesAtCell", checkedCollectResourcesAtCell)
+    sugarscape = makeSugarscape(agentDecisionModels=["bentham"], environmentRegrowthMode=regrowthMode, environmentSeasonalGrowbackDelay=2,
+                                environmentSeasonInterval=5, environmentSpiceRegrowRate=0.5, environmentStorageMode=storageMode,
+                                environmentSugarRegrowRate=0.5, startingAgents=200, timesteps=20)
+    environment = sugarscape.environment
+    for timestep in range(20):
+        sugarscape.doTimestep()
+        assert [cell.findNeighborWealth() for cell in environment.cells] == [findFreshNeighborWealth(cell) for cell in environment.cells]
+
+occupancyScenarios = {"replacement": {"agentMaxAge": [5, 15], "agentReplacements": 150},
+                      "reproduction": {"agentAggressionFactor": [0, 0], "agentFemaleFertilityAge": [1, 2], "agentMaleFertilityAge": [1, 2], "agentMaxAge": [10, 20],
+                                       "agentStartingSpice": [5, 5], "agentStartingSugar": [5, 5], "agentVision": [4, 6]},
+                      "combat": {"agentAggressionFactor": [0, 1], "environmentMaxCombatLoot": 10}}
+
+@pytest.mark.parametrize("scenario", occupancyScenarios)
+def test_occupancyMatchesCellAgents(makeSugarscape, scenario):
+    sugarscape = makeSugarscape(agentDecisionModels=["none"], startingAgents=300, timesteps=15, **occupancyScenarios[scenario])
+    environment = sugarscape.environment
+    regionCells = [[] for region in environment.emptyRegionCells]
+    for cell in environment.cells:
+        if environment.cellRegions[cell.index] >= 0:
+            regionCells[environment.cellRegions[cell.index]].append(cell)
+    for timestep in range(15):
+        sugarscape.doTimestep()
+        assert [environment.cellOccupancy[cell.index] == 1 for cell in environment.cells] == [cell.agent != None for cell in environment.cells]
+        for region, emptyCells in enumerate(environment.emptyRegionCells):
+            assert sorted(cell.index for cell in emptyCells) == sorted(cell.index for cell in regionCells[region] if cell.agent == None)
+            assert all(environment.emptyCellPositions[cell.index] == position for position, cell in enumerate(emptyCells))
@@ -0,0 +1,23 @@
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+def compareEthicalValues(sugarscape):
+    for agent in sugarscape.agents:
+        agent.findCellsInRange()
+    for agent in sugarscape.agents:
+        agent.findNeighborhood()
+        cells = list(agent.cellsInRange) + [agent.cell]
+        ethicalNeighbors = agent.findEthicalNeighbors()
+        ethicalCells = agent.findEthicalCells(cells)
+        assert agent.findArrayEthicalValuesOfCells(cells, ethicalCells, ethicalNeighbors) == agent.findObjectEthicalValuesOfCells(cells, ethicalCells, ethicalNeighbors)
+
+@pytest.mark.parametrize("decisionModel", ["bentham", "altruisticHalfLookahead", "egoistic", "negativeBentham"])
+def test_arrayEthicalValuesMatchObjectValues(makeSugarscape, decisionModel):
+    sugarscape = makeSugarscape(agentDecisionModels=[decisionModel], agentDecisionModelFactor=[1, 1], agentDecisionModelLookaheadDiscount=[0.5, 0.5],
+                                agentDecisionModelTribalFactor=[0.3, 0.7], agentVision=[4, 8], environmentPollutionTimeframe=[0, 20], environmentSugarConsumptionPollutionFactor=1,
+                                startingAgents=400, timesteps=5)
+    for timestep in range(5):
+        sugarscape.doTimestep()
+    # Both paths sum each cell's neighbors in the same order, so their values agree exactly
+    compareEthicalValues(sugarscape)